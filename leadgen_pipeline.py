@@ -1,70 +1,165 @@
-import sqlite3
-from src.fetcher import fetch_sam_opps, map_to_lead
-from src.scorer import strict_keyword_match, ai_enhanced_score, risk_score, compute_days_to_due, should_triage
-from src.detector import has_changed
-from src.storage import init_db, upsert_lead
-from src.triage import query_triagable, write_triage
+import argparse
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Tuple
+from src import extractors, semantic
+from src.cascade import Cascade
+from src.detector import compute_score_fingerprint, compute_score_fingerprints
+from src.fetcher import enrich_leads, enrich_opps, fetch_sam_opps_iter, incremental_window, map_to_lead, revalidate_content
+from src.storage import init_db, upsert_lead, upsert_scored_leads, get_watermark, set_watermark, get_fingerprints, query_leads_by_ids
+from src.triage import query_triagable, triaged_leads, write_triage
 import tomllib
 
 # Load config for thresholds
 with open("configs/leadgen.toml", "rb") as f:
     config = tomllib.load(f)
 
-def main():
-    init_db()
-    # First pass: Fetch + strict keyword filter (no AI)
-    raw_opps = fetch_sam_opps(parse_attachments=False)  # Skip parse initially for speed
-    leads = [map_to_lead(item) for item in raw_opps if item.get("id")]
-    strict_filtered = [lead for lead in leads if strict_keyword_match(lead["title"], lead["description"], lead["naics"])]
+# Streaming stages: each takes an iterable and yields lazily, so a page is scored and
+# upserted while later pages are still downloading. Peak memory ~ one page per stage.
+def iter_leads(pages: Iterable[List[Dict]], seen: Dict = None) -> Iterator[Dict]:
+    """Map raw opps to leads; records the newest postedDate in seen["last_posted"]."""
+    seen = {} if seen is None else seen
+    for page in pages:
+        for item in page:
+            posted = (item.get("postedDate") or "")[:10]
+            if posted > seen.get("last_posted", ""):
+                seen["last_posted"] = posted
+            if item.get("noticeId"):
+                yield map_to_lead(item)
 
-    if not strict_filtered:
-        print("No keyword matches in first pass.")
-        return
+def iter_changed(leads: Iterable[Dict], rescore_all: bool = False, scorer: str = "batch", batch_size: int = 500,
+                 stats: Dict = None) -> Iterator[Dict]:
+    """Leads whose scoring fingerprint differs from the stored one (all with rescore_all);
+    scorer is the formula about to score them (src/detector.py SCORERS). Counts go to
+    stats["changed"]/["unchanged"] if given.
+    Runs before enrichment: content is compared via the HTTP cache, not re-parsed."""
+    stats = {} if stats is None else stats
+    stats.update(changed=0, unchanged=0)
+    batch = []
+    for lead in leads:
+        batch.append(lead)
+        if len(batch) >= batch_size:
+            yield from _changed_batch(batch, rescore_all, scorer, stats)
+            batch = []
+    if batch:
+        yield from _changed_batch(batch, rescore_all, scorer, stats)
+
+def _changed_batch(batch: List[Dict], rescore_all: bool, scorer: str, stats: Dict) -> Iterator[Dict]:
+    stored = {} if rescore_all else get_fingerprints([lead["sam_id"] for lead in batch])
+    known = [lead for lead in batch if lead["sam_id"] in stored]
+    revalidate_content(known)  # amended description/attachment at the same URL -> new content hash
+    unchanged = {lead["sam_id"] for lead, fp in zip(known, compute_score_fingerprints(known, scorer=scorer)) if fp == stored[lead["sam_id"]]}
+    changed = [lead for lead in batch if lead["sam_id"] not in unchanged]
+    stats["changed"] += len(changed)
+    stats["unchanged"] += len(unchanged)
+    if len(changed) < len(batch):
+        print(f"Skipping {len(batch) - len(changed)} unchanged leads (scores up to date)")
+    yield from changed
 
-    print(f"Strict filter: {len(strict_filtered)} / {len(leads)} leads proceed to parse/AI.")
+def enrich(leads: List[Dict]) -> Iterator[Dict]:
+    """Attach parsed_doc_text/description text via targeted enrich_leads, in small batches."""
+    batch_size = config["api"].get("enrich_batch", 25)
+    for i in range(0, len(leads), batch_size):
+        batch = leads[i:i + batch_size]
+        enrich_leads(batch)
+        yield from batch
 
-    # Second pass: Re-fetch/parse attachments for filtered leads (targeted, not bulk)
-    sam_ids = [lead["sam_id"] for lead in strict_filtered]
-    # Note: For real, query SAM by ID for attachments; mock here
-    enriched_opps = fetch_sam_opps(parse_attachments=True)  # Full fetch with parse (or optimize to ID-specific)
-    enriched_map = {opp["id"]: opp for opp in enriched_opps}
-    for lead in strict_filtered:
-        if lead["sam_id"] in enriched_map:
-            lead["parsed_doc_text"] = enriched_map[lead["sam_id"]].get("parsed_doc_text", "")
+def fetch_window(full_window: bool = False, posted_from: str = None, posted_to: str = None) -> Tuple[str, str]:
+    """Incremental mode: only the delta since the last successful run (minus overlap margin).
+    An explicit posted_from/posted_to (backfill) wins over both the watermark and config."""
+    if posted_from or posted_to:
+        window = (posted_from or config["api"]["posted_from"], posted_to or datetime.now().strftime('%m/%d/%Y'))
+        print(f"Posted window {window[0]} - {window[1]} (explicit)")
+        return window
+    watermark = None if full_window or not config["api"].get("incremental", False) else get_watermark("sam")
+    window = incremental_window(watermark)
+    print(f"Posted window {window[0]} - {window[1]}" + (f" (watermark {watermark})" if watermark else ""))
+    return window
 
-    # AI scoring on enriched
-    for lead in strict_filtered:
-        lead["fit_score"] = ai_enhanced_score(lead["title"], lead["description"], lead["naics"], lead["parsed_doc_text"])
-        lead["risk_score"] = risk_score(lead["soc"], compute_days_to_due(lead["response_deadline"]))
-        lead["days_to_due"] = compute_days_to_due(lead["response_deadline"])
+def advance_watermark(fetch_stats: Dict, seen: Dict) -> None:
+    """Only a clean, complete run on real data may advance the watermark, otherwise failed or
+    unfetched records would be skipped for good next time."""
+    if fetch_stats.get("errors"):
+        print(f"{fetch_stats['errors']} fetch errors; watermark not advanced.")
+    elif fetch_stats.get("truncated"):
+        print(f"Fetched only part of {fetch_stats.get('total')} records ([api] limit / --limit, or an oversized day); watermark not advanced.")
+    elif fetch_stats.get("mock"):
+        print("Mock data (no SAM API key); watermark not advanced.")
+    elif seen.get("last_posted"):
+        set_watermark("sam", seen["last_posted"])
+
+def main(full_window: bool = False, posted_from: str = None, posted_to: str = None, rescore_all: bool = False, limit: int = None):
+    init_db()
+    keywords = config["filters"]["keywords"]
+    window = fetch_window(full_window, posted_from, posted_to)
 
-    # Upsert changed
-    conn = sqlite3.connect("opps.db")
+    # Fetch → cascade (metadata → keywords → embeddings on the best → attachments for the
+    # promising), all streamed so scoring of early pages overlaps later page downloads
+    fetch_stats, change_stats, seen = {}, {}, {}
+    pages = fetch_sam_opps_iter(limit, posted_from=window[0], posted_to=window[1], parse_attachments=False, stats=fetch_stats)
+    cascade = Cascade(keywords, enrich=enrich)
     updated = 0
-    for lead in strict_filtered:
-        if has_changed(conn, lead):
-            upsert_lead(conn, lead)
-            updated += 1
-    conn.close()
-    print(f"AI-enriched: {updated} updated.")
+    for lead in cascade.run(iter_changed(iter_leads(pages, seen), rescore_all, scorer="cascade", stats=change_stats)):
+        lead["score_fingerprint"] = compute_score_fingerprint(lead, scorer="cascade")  # after enrichment cached its content
+        upsert_lead(lead)
+        updated += 1
+    print(f"Cascade:\n{cascade.report()}")
+    if semantic.stats["sentences"]:
+        print(semantic.inference_report())
 
-    # Triage
+    advance_watermark(fetch_stats, seen)
+
+    if updated:
+        print(f"AI-enriched: {updated} updated.")
+    elif change_stats.get("unchanged") and not change_stats.get("changed"):
+        print(f"All {change_stats['unchanged']} leads unchanged since their last scoring; nothing to re-score.")
+    else:
+        print("No keyword matches in first pass.")
+
+    # Triage (stored leads too, so it runs whether or not this window changed anything)
     triaged_leads = query_triagable()
     write_triage(triaged_leads)
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full-window", action="store_true", help="Ignore the watermark and fetch the configured [api] window")
+    ap.add_argument("--from", dest="posted_from", help="Backfill start, MM/dd/yyyy (oversized windows are split automatically)")
+    ap.add_argument("--to", dest="posted_to", help="Backfill end, MM/dd/yyyy (default today)")
+    ap.add_argument("--limit", type=int, help="Most records to fetch (default [api] limit; 0 = no cap)")
+    ap.add_argument("--rescore-all", action="store_true", help="Score leads even when their scoring fingerprint is unchanged")
+    args = ap.parse_args()
+
     init_db()  # Setup DB
     print("Fetching SAM opps...")
-    opps = fetch_sam_opps(parse_attachments=True)  # Enable parsing
-    leads = [map_to_lead(opp) for opp in opps]
-    print(f"Fetched {len(leads)} leads")
-    triaged = triaged_leads(leads)
-    print(f"Triaged {len(triaged)} hot leads (keyword matches: see scores)")
-    if triaged:
-        output = write_triage(triaged)
+    window = fetch_window(args.full_window, args.posted_from, args.posted_to)
+    fetch_stats, seen = {}, {}
+    fetched = 0
+    triaged, hot_unchanged = [], []
+    # Fingerprint check first, then descriptions/attachments only for the leads that need scoring
+    pages = fetch_sam_opps_iter(args.limit, posted_from=window[0], posted_to=window[1], parse_attachments=False, stats=fetch_stats)
+    for page in pages:
+        leads = list(iter_leads([page], seen))
+        fetched += len(leads)
+        changed_ids = {lead["sam_id"] for lead in iter_changed(leads, args.rescore_all)}
+        changed = [opp for opp in page if opp.get("noticeId") in changed_ids]
+        enrich_opps(changed)
+        scored = [map_to_lead(opp) for opp in changed]
+        hot = triaged_leads(scored)
+        triaged.extend(hot)
+        # Store the rest too (hot ones go through write_triage): a lead without a stored
+        # fingerprint counts as changed and would be re-enriched and re-scored every run
+        upsert_scored_leads([lead for lead in scored if not lead.get("triaged")])
+        unchanged_ids = [lead["sam_id"] for lead in leads if lead["sam_id"] not in changed_ids]
+        hot_unchanged.extend(lead for lead in query_leads_by_ids(unchanged_ids) if lead.get("triaged"))
+    advance_watermark(fetch_stats, seen)
+    print(f"Fetched {fetched} leads")
+    print(f"Attachment extractor timings:\n{extractors.timing_report()}")
+    print(f"Triaged {len(triaged)} hot leads (keyword matches: see scores), "
+          f"{len(hot_unchanged)} more already hot and unchanged")
+    if triaged or hot_unchanged:
+        output = write_triage(triaged + hot_unchanged)  # every hot lead of the window, as before
         print(f"Exported to {output}")
     else:
         print("No matches—tune keywords/dates in config!")
     # Bonus: Query triagable for next run
     triagable = query_triagable()
-    print(f"{len(triagable)} triagable leads in DB")
\ No newline at end of file
+    print(f"{len(triagable)} triagable leads in DB")
@@ -1,5 +1,5 @@
-import requests
 from bs4 import BeautifulSoup
+from src import http_client  # Shared keep-alive session
 from utils import logger, mock_results
 
 def query_sam_gov(config):
@@ -8,7 +8,7 @@ def query_sam_gov(config):
         url = f"{config['base_url']}{config['endpoint']}"
         params = config['params']
         headers = {'api-key': config['auth']['api_key']} if config['auth'] else {}
-        response = requests.get(url, params=params, headers=headers)
+        response = http_client.get(url, params=params, headers=headers)
         response.raise_for_status()
         data = response.json()
         # Parse: adapt based on actual API response (e.g., data['opportunities'])
@@ -33,7 +33,7 @@ def query_grants_gov(config):
     try:
         url = f"{config['base_url']}{config['endpoint']}"
         params = config['params']
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params=params)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, 'html.parser')
         # Parse: target actual selectors (e.g., '.search-result-title')
@@ -0,0 +1,121 @@
+import re
+import json
+import argparse
+import time
+from datetime import datetime
+from typing import Dict, List
+import numpy as np
+from src.detector import compute_score_fingerprints
+from src.scorer import config, compute_days_to_due, get_matcher, lead_text
+
+# Whole-run scoring: one keyword scan per lead (the only per-lead Python work), then keyword
+# counts, deadline deltas, risk, overall score and the should_triage filters as NumPy arrays.
+# Same numbers as scorer.fit_score / risk_score / should_triage, lead for lead.
+
+_DEADLINE_RE = re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}')  # the two formats compute_days_to_due accepts
+
+def days_to_due(deadlines: List[str], now: datetime = None) -> np.ndarray:
+    """Whole days until each deadline (floored like timedelta.days); NaN where unparseable."""
+    now = np.datetime64(now or datetime.now(), 'us')
+    days = np.full(len(deadlines), np.nan)
+    idx = [i for i, d in enumerate(deadlines) if d and _DEADLINE_RE.fullmatch(d)]
+    if idx:
+        try:
+            parsed = np.array([deadlines[i].replace(' ', 'T') for i in idx], dtype='datetime64[s]')
+            days[idx] = (parsed - now) // np.timedelta64(1, 'D')
+        except ValueError:  # e.g. Feb 30 somewhere in the batch: parse one by one
+            days[idx] = [np.nan if (d := compute_days_to_due({'response_deadline': deadlines[i]})) is None else d for i in idx]
+    regular = set(idx)
+    for i in (i for i, d in enumerate(deadlines) if d and i not in regular):  # strptime also takes unpadded fields ('2025-1-5 9:00:00')
+        d = compute_days_to_due({'response_deadline': deadlines[i]})
+        days[i] = np.nan if d is None else d
+    return days
+
+def score_batch(leads: List[Dict], keywords: list = None, now: datetime = None) -> Dict[str, np.ndarray]:
+    """Score a list of leads at once.
+
+    Returns arrays aligned with leads: keyword_matrix (n x keywords, bool), keyword_count,
+    word_count, exclude_count, risk_count, days_to_due (NaN = none), fit, risk, overall, triage.
+    """
+    keywords = config['filters']['keywords'] if keywords is None else keywords
+    matcher = get_matcher(keywords)
+    column = {kw: j for j, kw in enumerate(matcher.keywords)}
+    n = len(leads)
+    matrix = np.zeros((n, len(matcher.keywords)), dtype=bool)
+    word_count = np.zeros(n)
+    exclude_count = np.zeros(n)
+    risk_count = np.zeros(n)
+    for i, lead in enumerate(leads):
+        match = matcher.scan(lead_text(lead))
+        matrix[i, [column[kw] for kw in match.keyword_hits]] = True
+        word_count[i] = match.word_count
+        exclude_count[i] = len(match.exclude_hits)
+        risk_count[i] = len(match.risk_hits)
+
+    # fit_score: distinct hits / keywords, plus hits / words when there are words
+    keyword_count = matrix.sum(axis=1).astype(float)
+    fit = keyword_count / max(len(keywords), 1)
+    fit = np.where(word_count > 0, np.minimum(fit + keyword_count / np.maximum(word_count, 1), 1.0), fit)
+
+    # risk_score: 0.2 per risk term, plus deadline risk (a deadline today counts as none, as in risk_score)
+    days = days_to_due([lead.get('response_deadline') for lead in leads], now)
+    has_days = ~np.isnan(days) & (days != 0)
+    deadline_risk = np.select([has_days & (days < 30), has_days & (days < 60)], [1.0, 0.5], 0.0)
+    risk = np.minimum(risk_count * 0.2 + deadline_risk, 1.0)
+
+    scoring, filters = config['scoring'], config['filters']
+    overall = fit * scoring['fit_weight'] + (1 - risk) * scoring['risk_weight']
+    value = np.array([lead.get('estimatedValue') or 0 for lead in leads], dtype=float)
+    within_days = np.isnan(days) | ((days <= filters['max_days_to_due']) & (days > 0))
+    triage = (overall >= scoring['threshold']) & within_days & (value >= filters['min_value']) & (exclude_count == 0)
+
+    return {
+        'keyword_matrix': matrix, 'keyword_count': keyword_count, 'word_count': word_count,
+        'exclude_count': exclude_count, 'risk_count': risk_count, 'days_to_due': days,
+        'fit': fit, 'risk': risk, 'overall': overall, 'triage': triage,
+    }
+
+def rescore(since: str = None, mark_triaged: bool = False, rescore_all: bool = False) -> Dict[str, int]:
+    """Re-score stored leads with the current config and bulk-write fit/risk scores.
+    Leads whose scoring fingerprint (src/detector.py) is unchanged are skipped unless rescore_all."""
+    from src.storage import query_leads, bulk_update_scores, set_meta
+    start = time.perf_counter()
+    stored = query_leads(since=since)
+    leads, fingerprints = [], []
+    for lead, fp in zip(stored, compute_score_fingerprints(stored)):
+        if rescore_all or lead.get('score_fingerprint') != fp:
+            leads.append(lead)
+            fingerprints.append(fp)
+    skipped = len(stored) - len(leads)
+    if not leads:
+        if since is None:
+            set_meta('scored_keywords', json.dumps(config['filters']['keywords']))
+        print(f"No leads to rescore ({skipped} unchanged)")
+        return {'leads': 0, 'skipped': skipped, 'triage': 0, 'newly_triaged': 0}
+    scores = score_batch(leads)
+    now = datetime.now().isoformat()
+    updates = []
+    newly_triaged = 0
+    for lead, fp, fit, risk, triage in zip(leads, fingerprints, scores['fit'], scores['risk'], scores['triage']):
+        mark = bool(mark_triaged and triage and not lead.get('triaged'))
+        newly_triaged += mark
+        updates.append({'sam_id': lead['sam_id'], 'fit_score': float(fit), 'risk_score': float(risk),
+                        'triaged': mark, 'triaged_at': now if mark else None, 'score_fingerprint': fp})
+    bulk_update_scores(updates)
+    if since is None:  # every stored lead is now scored with the configured keywords (src/term_index.py baseline)
+        set_meta('scored_keywords', json.dumps(config['filters']['keywords']))
+    counts = {'leads': len(leads), 'skipped': skipped, 'triage': int(scores['triage'].sum()), 'newly_triaged': newly_triaged}
+    print(f"Rescored {counts['leads']} leads in {time.perf_counter() - start:.1f}s ({skipped} unchanged, skipped): "
+          f"{counts['triage']} pass triage, {newly_triaged} newly marked triaged")
+    keywords = get_matcher().keywords
+    for kw, hits in zip(keywords, scores['keyword_matrix'].sum(axis=0)):
+        print(f"  {kw}: {int(hits)} leads")
+    return counts
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Re-score stored leads with the current [filters]/[scoring] config")
+    ap.add_argument("--since", help="Only leads posted on/after YYYY-MM-DD")
+    ap.add_argument("--mark-triaged", action="store_true", help="Also flag leads that now pass triage as triaged")
+    ap.add_argument("--rescore-all", action="store_true", help="Re-score leads whose scoring fingerprint is unchanged too")
+    args = ap.parse_args()
+    rescore(args.since, args.mark_triaged, args.rescore_all)
@@ -0,0 +1,197 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from PyPDF2 import PdfReader
+from src import extractors
+
+# Offline extractor benchmark: every installed backend in the registry (the same code path
+# parser.parse_attachments and fetch_summaries use) runs over a local corpus, each backend in
+# a fresh child process so peak RSS is its own. Reports pages/sec, MB/s, peak RSS and text
+# length relative to the preferred backend for that type.
+#
+#   python -m src.bench_extractors --generate          # build data/bench_corpus, then benchmark
+#   python -m src.bench_extractors --corpus DIR        # benchmark your own PDFs/DOCX/HTML/...
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'data', 'bench_corpus')
+
+WORDS = ("software development consulting services contractor shall provide support "
+         "requirements system data security network cloud migration program management "
+         "evaluation proposal offeror technical approach past performance price schedule "
+         "deliverables personnel agency mission operations maintenance training").split()
+
+# --- Corpus generation (hand-written files; no writer libraries needed) ---
+
+def _sentences(rng: random.Random, count: int) -> List[str]:
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 14))).capitalize() + "." for _ in range(count)]
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, pages: List[List[str]]) -> None:
+    """Minimal PDF 1.4: one Helvetica text stream per page, xref table built by offset."""
+    n = len(pages)
+    objs = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{4 + 2 * i} 0 R' for i in range(n))}] /Count {n} >>",
+        3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for i, lines in enumerate(pages):
+        stream = "BT /F1 10 Tf 12 TL 50 750 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        objs[4 + 2 * i] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {5 + 2 * i} 0 R "
+                           f"/Resources << /Font << /F1 3 0 R >> >> >>")
+        objs[5 + 2 * i] = f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream"
+    data, offsets = b"%PDF-1.4\n", {}
+    for num in sorted(objs):
+        offsets[num] = len(data)
+        data += f"{num} 0 obj\n{objs[num]}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    data += "".join(f"{offsets[num]:010d} 00000 n \n" for num in sorted(objs)).encode()
+    data += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(data)
+
+def write_docx(path: str, paragraphs: List[str]) -> None:
+    """Minimal DOCX package (content types, rels, document.xml)."""
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml",
+                    '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        zf.writestr("_rels/.rels",
+                    '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/></Relationships>')
+        zf.writestr("word/document.xml", f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{w}"><w:body>{body}</w:body></w:document>')
+
+def write_html(path: str, paragraphs: List[str]) -> None:
+    body = "".join(f"<p>{p}</p>\n" for p in paragraphs)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html><html><head><title>Notice</title><style>p {{margin: 0}}</style>"
+                f"<script>var x = 1;</script></head><body>\n{body}</body></html>")
+
+def generate_corpus(corpus_dir: str, seed: int = 42) -> List[str]:
+    """PDFs of 1-400 pages, DOCX of 20-2000 paragraphs, HTML of 20-5000 paragraphs."""
+    rng = random.Random(seed)
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = []
+    for pages in (1, 10, 50, 200, 400):
+        path = os.path.join(corpus_dir, f"solicitation_{pages:03d}p.pdf")
+        write_pdf(path, [_sentences(rng, 40) for _ in range(pages)])
+        paths.append(path)
+    for paras in (20, 200, 2000):
+        path = os.path.join(corpus_dir, f"sow_{paras:04d}.docx")
+        write_docx(path, _sentences(rng, paras))
+        paths.append(path)
+    for paras in (20, 500, 5000):
+        path = os.path.join(corpus_dir, f"notice_{paras:04d}.html")
+        write_html(path, _sentences(rng, paras))
+        paths.append(path)
+    print(f"Generated {len(paths)} files in {corpus_dir}")
+    return paths
+
+def load_corpus(corpus_dir: str) -> List[str]:
+    return sorted(os.path.join(corpus_dir, name) for name in os.listdir(corpus_dir)
+                  if os.path.isfile(os.path.join(corpus_dir, name)))
+
+# --- Measurement (runs in a fresh child per backend) ---
+
+def _peak_rss_mb() -> float:
+    """Peak resident memory of this process so far."""
+    try:
+        import resource  # Unix: ru_maxrss is KB on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        pass
+    try:
+        import psutil  # Windows: peak working set
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return float("nan")
+
+def _run_backend(kind: str, backend: str, paths: List[str], repeat: int, budget: bool) -> Dict:
+    if not budget:  # whole documents, so backends are compared on the same pages
+        extractors.PAGE_BUDGET.update(max_pages=0, index_sections=[], stop_after_hits=0)
+    start_rss = _peak_rss_mb()
+    results = {}
+    for path in paths:
+        best, text = None, ""
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            try:
+                text = extractors.extract(path, kind=kind, backend=backend) or ""
+            except Exception as e:
+                text = None
+                print(f"{backend} failed on {os.path.basename(path)}: {e}")
+                break
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        results[path] = (best, None if text is None else len(re.sub(r"\s+", " ", text).strip()))
+    return {"files": results, "start_rss": start_rss, "peak_rss": _peak_rss_mb()}
+
+def _pages(path: str, kind: str) -> int:
+    if kind != "pdf":
+        return 1  # DOCX/HTML have no fixed pages: counted per document
+    try:
+        return len(PdfReader(path).pages)
+    except Exception:
+        return 0
+
+def benchmark(paths: List[str], repeat: int = 3, budget: bool = False) -> List[Tuple]:
+    by_kind: Dict[str, List[str]] = {}
+    for path in paths:
+        kind = extractors.sniff(path, path)
+        if kind:
+            by_kind.setdefault(kind, []).append(path)
+    ctx = multiprocessing.get_context("spawn")  # fresh interpreter per backend: clean peak RSS
+    rows = []
+    for kind, kind_paths in sorted(by_kind.items()):
+        pages = {p: _pages(p, kind) for p in kind_paths}
+        size_mb = sum(os.path.getsize(p) for p in kind_paths) / (1024 * 1024)
+        reference = None
+        for backend, _ in extractors.backends_for(kind):
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                run = pool.submit(_run_backend, kind, backend, kind_paths, repeat, budget).result()
+            files = run["files"]
+            ok = [p for p, (secs, chars) in files.items() if secs is not None]
+            seconds = sum(files[p][0] for p in ok)
+            if reference is None:
+                reference = files  # first (preferred) backend is the parity baseline
+            ratios = [files[p][1] / reference[p][1] for p in ok if reference.get(p, (None, None))[1]]
+            rows.append((
+                kind, backend, len(ok), len(kind_paths), sum(pages[p] for p in ok), seconds,
+                sum(pages[p] for p in ok) / seconds if seconds else 0.0,
+                size_mb / seconds if seconds and len(ok) == len(kind_paths) else float("nan"),
+                run["peak_rss"], run["peak_rss"] - run["start_rss"],
+                sum(ratios) / len(ratios) if ratios else float("nan"), min(ratios) if ratios else float("nan"),
+            ))
+    return rows
+
+def print_report(rows: List[Tuple]) -> None:
+    print(f"{'type':<5} {'backend':<12} {'ok':>7} {'pages':>6} {'sec':>8} {'pages/s':>9} {'MB/s':>7} "
+          f"{'peak MB':>8} {'+MB':>6} {'len/ref':>8} {'min':>6}")
+    for kind, backend, ok, total, pages, secs, pps, mbps, peak, grown, mean_ratio, min_ratio in rows:
+        print(f"{kind:<5} {backend:<12} {f'{ok}/{total}':>7} {pages:>6} {secs:>8.3f} {pps:>9.1f} {mbps:>7.2f} "
+              f"{peak:>8.1f} {grown:>6.1f} {mean_ratio:>8.2f} {min_ratio:>6.2f}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark attachment extraction backends on a local corpus")
+    ap.add_argument("--corpus", default=DEFAULT_CORPUS, help="Directory of documents (default data/bench_corpus)")
+    ap.add_argument("--generate", action="store_true", help="(Re)generate the synthetic corpus into --corpus first")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per file; the fastest is kept")
+    ap.add_argument("--budget", action="store_true", help="Apply the [attachments] page budget instead of whole documents")
+    args = ap.parse_args()
+
+    paths = generate_corpus(args.corpus) if args.generate or not os.path.isdir(args.corpus) else load_corpus(args.corpus)
+    print_report(benchmark(paths, repeat=args.repeat, budget=args.budget))
@@ -0,0 +1,97 @@
+import os
+import hashlib
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from io import BytesIO
+from typing import BinaryIO
+import tomllib
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+attach_cfg = config.get("attachments", {})
+
+# Content-addressed attachment store: blobs/<aa>/<sha256>, plus a SQLite index of
+# per-blob size/last access for LRU eviction. URL -> blob mapping lives in http_cache.
+store_dir = attach_cfg.get("store_dir") or os.path.join(os.path.dirname(__file__), '..', 'data', 'attachments')
+index_path = os.path.join(store_dir, 'index.db')
+max_store_bytes = int(attach_cfg.get("max_store_mb", 2048)) * 1024 * 1024
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(store_dir, exist_ok=True)
+    conn = sqlite3.connect(index_path, timeout=30)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER,
+            created_at TEXT,
+            last_access TEXT
+        )
+    ''')
+    return conn
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(store_dir, 'blobs', sha256[:2], sha256)
+
+def touch(sha256: str) -> bool:
+    """Mark a blob recently used; False if it has been evicted."""
+    if not os.path.exists(blob_path(sha256)):
+        return False
+    conn = _connect()
+    conn.execute("UPDATE blobs SET last_access = ? WHERE sha256 = ?", (datetime.now().isoformat(), sha256))
+    conn.commit()
+    conn.close()
+    return True
+
+def read_blob(sha256: str) -> bytes:
+    with open(blob_path(sha256), 'rb') as f:
+        return f.read()
+
+def put_blob(content: bytes) -> str:
+    """Store content under its sha256 (no-op if already present), evict if over budget."""
+    return put_file(BytesIO(content), hashlib.sha256(content).hexdigest(), len(content))
+
+def put_file(fileobj: BinaryIO, sha256: str, size: int) -> str:
+    """Store an already-hashed stream (e.g. a spooled download) without loading it into memory."""
+    path = blob_path(sha256)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+        os.replace(tmp, path)  # atomic; concurrent writers of the same hash are harmless
+    now = datetime.now().isoformat()
+    conn = _connect()
+    conn.execute('''
+        INSERT INTO blobs (sha256, size, created_at, last_access) VALUES (?, ?, ?, ?)
+        ON CONFLICT(sha256) DO UPDATE SET last_access = excluded.last_access
+    ''', (sha256, size, now, now))
+    conn.commit()
+    conn.close()
+    evict()
+    return sha256
+
+def evict(max_bytes: int = None) -> int:
+    """Drop least-recently-used blobs until the store fits max_bytes. Returns bytes freed."""
+    max_bytes = max_store_bytes if max_bytes is None else max_bytes
+    conn = _connect()
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+    freed = 0
+    if total > max_bytes:
+        for sha256, size in conn.execute("SELECT sha256, size FROM blobs ORDER BY last_access").fetchall():
+            if total - freed <= max_bytes:
+                break
+            try:
+                os.remove(blob_path(sha256))
+            except FileNotFoundError:
+                pass
+            conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            freed += size
+        conn.commit()
+        print(f"Attachment store: evicted {freed} bytes (LRU)")
+    conn.close()
+    return freed
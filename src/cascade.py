@@ -0,0 +1,140 @@
+import os
+import time
+from typing import Callable, Dict, Iterable, Iterator, List
+import tomllib
+from src.scorer import get_matcher, fit_score, ai_enhanced_scores, risk_score, compute_days_to_due
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+cascade_cfg = config.get("cascade", {})
+
+# Staged scoring, cheapest first, so each costlier stage sees as few leads as possible:
+#   metadata    - NAICS, deadline window, exclude terms (drops leads)
+#   keyword     - at least one [filters] keyword in title/description (drops leads)
+#   embedding   - semantic fit on title/description, only for the top-K / above-margin leads
+#   attachments - fetch + parse attachments and re-score on the full text, only above margin
+# The last two refine scores instead of dropping: leads below their margin keep the previous
+# stage's score. Leads flow in batches; every stage counts leads in/worked/out and its time.
+STAGES = ("metadata", "keyword", "embedding", "attachments")
+
+
+class Cascade:
+    def __init__(self, keywords: list = None, enrich: Callable[[List[Dict]], Iterable[Dict]] = None, stages: List[str] = None):
+        """enrich(batch) attaches parsed_doc_text to leads (the attachments stage); without it
+        that stage is skipped."""
+        self.keywords = config['filters']['keywords'] if keywords is None else keywords
+        self.enrich = enrich
+        self.stages = [s for s in (stages or cascade_cfg.get("stages", STAGES)) if s in STAGES]
+        self.stats = {s: {"in": 0, "worked": 0, "out": 0, "seconds": 0.0} for s in self.stages}
+        self._matches = {}  # id(lead) -> title/description scan, shared by metadata and keyword
+
+    def _match(self, lead: Dict):
+        key = id(lead)
+        if key not in self._matches:
+            self._matches[key] = get_matcher(self.keywords).scan(_head_text(lead))
+        return self._matches[key]
+
+    def metadata(self, batch: List[Dict]) -> List[Dict]:
+        naics = set(config['filters'].get('naics_codes', []))
+        max_days = config['filters']['max_days_to_due']
+        kept = []
+        for lead in batch:
+            if naics and lead.get("naics") and lead["naics"] not in naics:
+                continue
+            days = compute_days_to_due(lead)
+            if days is not None and (days <= 0 or days > max_days):
+                continue
+            if self._match(lead).exclude_hits:
+                continue
+            kept.append(lead)
+        self.stats["metadata"]["worked"] += len(batch)
+        return kept
+
+    def keyword(self, batch: List[Dict]) -> List[Dict]:
+        kept = []
+        for lead in batch:
+            match = self._match(lead)
+            if match.keyword_hits:
+                lead["fit_score"] = fit_score(_head_text(lead), self.keywords, match)
+                kept.append(lead)
+        self.stats["keyword"]["worked"] += len(batch)
+        return kept
+
+    def embedding(self, batch: List[Dict]) -> List[Dict]:
+        margin = cascade_cfg.get("embed_min_fit", 0.0)
+        ranked = sorted((lead for lead in batch if lead.get("fit_score", 0.0) >= margin),
+                        key=lambda lead: lead.get("fit_score", 0.0), reverse=True)
+        top_k = cascade_cfg.get("embed_top_k", 0)
+        selected = ranked[:top_k] if top_k else ranked
+        if selected:
+            texts = [_head_text(lead) for lead in selected]
+            matches = [self._matches.get(id(lead)) for lead in selected]
+            for lead, fit in zip(selected, ai_enhanced_scores(texts, self.keywords, matches)):
+                lead["fit_score"] = fit
+        self.stats["embedding"]["worked"] += len(selected)
+        return batch
+
+    def attachments(self, batch: List[Dict]) -> List[Dict]:
+        if self.enrich is None:
+            return batch
+        margin = cascade_cfg.get("attach_min_score", 0.0)
+        selected = [lead for lead in batch if lead.get("fit_score", 0.0) >= margin]
+        if selected:
+            enriched = list(self.enrich(selected))
+            texts = [_head_text(lead) + " " + (lead.get("parsed_doc_text") or "") for lead in enriched]
+            for lead, fit in zip(enriched, ai_enhanced_scores(texts, self.keywords)):
+                lead["fit_score"] = fit
+        self.stats["attachments"]["worked"] += len(selected)
+        return batch
+
+    def run_batch(self, batch: List[Dict]) -> List[Dict]:
+        """All stages over one batch; returns the surviving leads, scored."""
+        for stage in self.stages:
+            start = time.perf_counter()
+            self.stats[stage]["in"] += len(batch)
+            batch = getattr(self, stage)(batch)
+            self.stats[stage]["out"] += len(batch)
+            self.stats[stage]["seconds"] += time.perf_counter() - start
+        for lead in batch:
+            lead.setdefault("fit_score", 0.0)
+            lead["risk_score"] = risk_score(lead)
+            lead["days_to_due"] = compute_days_to_due(lead)
+        self._matches.clear()
+        return batch
+
+    def run(self, leads: Iterable[Dict], batch_size: int = None) -> Iterator[Dict]:
+        """Stream leads through the cascade in batches (so the semantic model embeds many at once)."""
+        batch_size = batch_size or cascade_cfg.get("batch_size", 64)
+        batch = []
+        for lead in leads:
+            batch.append(lead)
+            if len(batch) >= batch_size:
+                yield from self.run_batch(batch)
+                batch = []
+        if batch:
+            yield from self.run_batch(batch)
+
+    def report(self) -> str:
+        lines = [f"{'stage':<12} {'in':>7} {'worked':>7} {'out':>7} {'seconds':>8}"]
+        for stage in self.stages:
+            s = self.stats[stage]
+            lines.append(f"{stage:<12} {s['in']:>7} {s['worked']:>7} {s['out']:>7} {s['seconds']:>8.2f}")
+        return "\n".join(lines)
+
+
+def _head_text(lead: Dict) -> str:
+    return (lead.get("title") or "") + " " + (lead.get("description") or "")
+
+# Test stub
+if __name__ == "__main__":
+    mock_leads = [
+        {"sam_id": "1", "title": "Software development", "description": "IT services consulting", "naics": "541511"},
+        {"sam_id": "2", "title": "Grounds maintenance", "description": "software", "naics": "541511"},
+        {"sam_id": "3", "title": "Catering", "description": "Food service", "naics": "722310"},
+    ]
+    cascade = Cascade()
+    print([(lead["sam_id"], round(lead["fit_score"], 2)) for lead in cascade.run(mock_leads)])
+    print(cascade.report())
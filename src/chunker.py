@@ -0,0 +1,82 @@
+import os
+import re
+from typing import List, Sequence
+import tomllib
+from src.keyword_matcher import build_matcher
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+chunk_cfg = config.get("chunking", {})
+
+# Long documents (parsed attachments can run to hundreds of pages) are cut into fixed windows
+# of words that fit the embedding model's max_seq_length, and at most max_chunks of them per
+# lead are embedded - so semantic cost per lead is bounded however big the attachment is.
+# Which windows make the cut: the densest in [filters] keywords, or an even sample.
+
+WORD_RE = re.compile(r"\S+")
+
+def chunk_text(text: str, window: int = None, overlap: int = None) -> List[str]:
+    """Split text into windows of `window` words, consecutive windows sharing `overlap` words."""
+    window = window or chunk_cfg.get("window_words", 160)
+    overlap = chunk_cfg.get("overlap_words", 32) if overlap is None else overlap
+    step = max(window - overlap, 1)
+    spans = [m.span() for m in WORD_RE.finditer(text or "")]
+    chunks = []
+    for i in range(0, len(spans), step):
+        last = min(i + window, len(spans)) - 1
+        chunks.append(text[spans[i][0]:spans[last][1]])
+        if last == len(spans) - 1:
+            break
+    return chunks
+
+def _sample(n: int, budget: int) -> List[int]:
+    # Evenly spaced, always including the first and last window; deterministic, so the
+    # same document always yields the same chunks (and embedding cache hits)
+    if budget == 1:
+        return [0]
+    return sorted({round(i * (n - 1) / (budget - 1)) for i in range(budget)})
+
+def _densest(chunks: List[str], budget: int, keywords: Sequence[str]) -> List[int]:
+    matcher = build_matcher(tuple(keywords))
+    density = []
+    for i, chunk in enumerate(chunks):
+        match = matcher.scan(chunk)
+        density.append((len(match.keyword_hits) / max(match.word_count, 1), -i))
+    ranked = [-i for _, i in sorted(density[1:], reverse=True)]
+    return sorted([0] + ranked[:budget - 1])  # the opening window (title/summary) always counts
+
+def select_chunks(chunks: List[str], budget: int = None, mode: str = None, keywords: Sequence[str] = None) -> List[str]:
+    """At most `budget` chunks, in document order: mode "density" keeps the windows with the
+    most keyword hits per word, "sample" spreads them evenly over the document."""
+    budget = budget or chunk_cfg.get("max_chunks", 8)
+    mode = mode or chunk_cfg.get("select", "density")
+    if len(chunks) <= budget:
+        return chunks
+    if mode == "density":
+        keywords = config['filters']['keywords'] if keywords is None else keywords
+        idx = _densest(chunks, budget, keywords)
+    else:
+        idx = _sample(len(chunks), budget)
+    return [chunks[i] for i in idx]
+
+def lead_chunks(text: str, keywords: Sequence[str] = None) -> List[str]:
+    """The budgeted windows of one lead's text (a single empty chunk for empty text)."""
+    return select_chunks(chunk_text(text), keywords=keywords) or [""]
+
+def pool(scores: Sequence[float], method: str = None, top_k: int = None) -> float:
+    """One score from per-chunk scores: the max, or the mean of the top_k best."""
+    method = method or chunk_cfg.get("pooling", "max")
+    if method == "topk":
+        best = sorted(scores, reverse=True)[:top_k or chunk_cfg.get("top_k", 3)]
+        return sum(best) / len(best)
+    return max(scores)
+
+# Test stub
+if __name__ == "__main__":
+    doc = " ".join(f"word{i}" for i in range(1000)) + " cloud migration software development"
+    chunks = chunk_text(doc)
+    print(f"{len(chunks)} chunks; selected {len(select_chunks(chunks))}: {[c[:20] for c in select_chunks(chunks)]}")
+    print(f"Pooled: max {pool([0.2, 0.9, 0.5])}, top-2 {pool([0.2, 0.9, 0.5], 'topk', 2)}")
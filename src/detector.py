@@ -1,9 +1,38 @@
+import os
+import json
 import hashlib
 import sqlite3
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import tomllib
+from src import extractors, http_cache
+from src.fetcher import description_cache_url
+from src.scorer import compute_days_to_due
 
 DB_PATH = "../opps.db"  # Relative from src/
 
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+# Scoring fingerprint: a lead is re-scored only when something its score depends on changed -
+# its fetched fields, the scoring config, the scoring code, or which deadline bucket it is in
+# (risk steps at 30/60 days, triage at 0 and max_days_to_due, so those are the only moments
+# time alone changes a score).
+SCORING_SECTIONS = ("filters", "scoring", "semantic", "chunking", "cascade", "portfolios")
+SCORING_MODULES = ("scorer.py", "keyword_matcher.py", "semantic.py", "chunker.py", "cascade.py", "batch_scorer.py")
+ATTACHMENT_KEYS = ("max_pages", "index_sections", "stop_after_hits")  # decide parsed_doc_text from the same bytes
+INPUT_FIELDS = ("title", "naics", "response_deadline", "posted_date", "estimatedValue")
+# The scorer that wrote the stored score is part of the fingerprint too: "batch" (score_batch:
+# keyword fit on description + attachment - rescore, triage, term_index) and "cascade"
+# (leadgen_pipeline.main: semantic blend on title + description) give different fit_scores, so
+# each only skips leads whose stored score came from its own formula.
+SCORERS = ("batch", "cascade")
+# Description and attachment enter by content: the sha256 of the body http_cache holds for
+# the URL (the stored text is post-enrichment, so it can't be compared with a fresh fetch).
+# A URL that was never fetched counts by the URL itself.
+
 def compute_rev_hash(lead: Dict) -> str:
     content = f"{lead['title']}{lead['description']}{lead['response_deadline']}"
     return hashlib.sha256(content.encode()).hexdigest()
@@ -14,4 +43,68 @@ def has_changed(conn: sqlite3.Connection, lead: Dict) -> bool:
     existing = cursor.execute("SELECT rev_hash FROM opportunities WHERE sam_id = ?", (lead["sam_id"],)).fetchone()
     return not existing or existing[0] != rev_hash
 
-# Test stub: if __name__ == "__main__": print(compute_rev_hash({"title": "Test"}))
\ No newline at end of file
+def _content_keys(lead: Dict) -> Tuple[str, str]:
+    """http_cache keys of the lead's description and attachment ("" for none)."""
+    desc_url = lead.get("desc_url")
+    return (description_cache_url(desc_url) if desc_url else ""), (lead.get("attach_url") or "")
+
+def content_id(url: str, cache_key: str, entries: Dict[str, Dict]) -> str:
+    if not url:
+        return ""
+    entry = entries.get(cache_key)
+    return entry["sha256"] if entry else f"url:{url}"
+
+def _input_hash(lead: Dict, keys: Tuple[str, str], entries: Dict[str, Dict]) -> str:
+    content = "\0".join([str(lead.get(field) or "") for field in INPUT_FIELDS] + [
+        content_id(lead.get("desc_url"), keys[0], entries),
+        content_id(lead.get("attach_url"), keys[1], entries),
+    ])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def compute_input_hashes(leads: List[Dict]) -> List[str]:
+    """Input hash per lead, with one cache query for all their description/attachment URLs."""
+    keys = [_content_keys(lead) for lead in leads]
+    entries = http_cache.lookup_many(key for pair in keys for key in pair)
+    return [_input_hash(lead, pair, entries) for lead, pair in zip(leads, keys)]
+
+def compute_input_hash(lead: Dict) -> str:
+    return compute_input_hashes([lead])[0]
+
+@lru_cache(maxsize=4)
+def scoring_version(keywords: Tuple[str, ...] = None) -> str:
+    """Hash of the scoring config sections, the attachment page budget, the extractor version
+    and the scoring modules' source; keywords replaces [filters] keywords (what the version was
+    under another keyword list)."""
+    sections = {s: config.get(s) for s in SCORING_SECTIONS}
+    if keywords is not None:
+        sections["filters"] = dict(sections["filters"], keywords=list(keywords))
+    sections["attachments"] = {k: config.get("attachments", {}).get(k) for k in ATTACHMENT_KEYS}
+    h = hashlib.sha256(json.dumps(sections, sort_keys=True, default=str).encode())
+    h.update(extractors.version().encode())  # backends installed (e.g. pdfminer added), extraction code
+    for name in SCORING_MODULES:
+        with open(os.path.join(os.path.dirname(__file__), name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def deadline_bucket(lead: Dict) -> str:
+    days = compute_days_to_due(lead)
+    if days is None or days == 0:
+        return "none"  # risk_score treats a deadline today like no deadline
+    for bound, name in ((0, "past"), (29, "lt30"), (59, "lt60"), (config['filters']['max_days_to_due'], "window")):
+        if days <= bound:
+            return name
+    return "later"
+
+def compute_score_fingerprints(leads: List[Dict], keywords: List[str] = None, input_hashes: List[str] = None,
+                               scorer: str = "batch") -> List[str]:
+    """Fingerprint per lead; keywords replaces [filters] keywords, input_hashes (from
+    compute_input_hashes) saves the cache query when fingerprinting the same leads twice."""
+    version = scoring_version(None if keywords is None else tuple(keywords))
+    input_hashes = compute_input_hashes(leads) if input_hashes is None else input_hashes
+    return [hashlib.sha256(f"{input_hash}|{version}|{scorer}|{deadline_bucket(lead)}".encode()).hexdigest()[:32]
+            for lead, input_hash in zip(leads, input_hashes)]
+
+def compute_score_fingerprint(lead: Dict, keywords: List[str] = None, scorer: str = "batch") -> str:
+    return compute_score_fingerprints([lead], keywords, scorer=scorer)[0]
+
+# Test stub: if __name__ == "__main__": print(compute_rev_hash({"title": "Test"}))
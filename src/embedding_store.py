@@ -0,0 +1,153 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+import tomllib
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+sem_cfg = config.get("semantic", {})
+
+# Persistent embedding cache: key = sha256(normalized text + model id). Vectors live in one
+# append-only float16 file per model (rows of `dim` values) that readers np.memmap - every
+# process shares the OS page cache, nothing is copied or unpickled. A SQLite index maps
+# key -> row; rows are allocated inside a write transaction and the vectors are on disk
+# before the index commit, so readers never see a row without its data.
+store_dir = sem_cfg.get("store_dir") or os.path.join(os.path.dirname(__file__), '..', 'data', 'embeddings')
+index_path = os.path.join(store_dir, 'index.db')
+
+_memmaps: Dict[str, np.memmap] = {}
+_memmaps_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(store_dir, exist_ok=True)
+    conn = sqlite3.connect(index_path, timeout=60, isolation_level=None)  # explicit transactions below
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS embeddings (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            row INTEGER,
+            created_at TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS models (
+            model TEXT PRIMARY KEY,
+            dim INTEGER,
+            rows INTEGER
+        )
+    ''')
+    return conn
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+def text_key(text: str, model_id: str) -> str:
+    return hashlib.sha256((normalize(text) + "\0" + model_id).encode("utf-8")).hexdigest()
+
+def _vectors_path(model_id: str, dim: int) -> str:
+    slug = re.sub(r"[^\w.-]+", "_", model_id)[:80] + "_" + hashlib.sha256(model_id.encode()).hexdigest()[:8]
+    return os.path.join(store_dir, f"{slug}_{dim}.f16")
+
+def _read_rows(path: str, dim: int, rows: np.ndarray) -> np.ndarray:
+    """Rows from the memmap (re-mapped when the file has grown past the cached mapping)."""
+    need = int(rows.max()) + 1
+    with _memmaps_lock:
+        mm = _memmaps.get(path)
+        if mm is None or mm.shape[0] < need:
+            mm = np.memmap(path, dtype=np.float16, mode='r', shape=(os.path.getsize(path) // (2 * dim), dim))
+            _memmaps[path] = mm
+    return mm[rows].astype(np.float32)
+
+def _lookup(conn: sqlite3.Connection, keys: Sequence[str], model_id: str) -> Dict[str, int]:
+    found = {}
+    unique = list(dict.fromkeys(keys))
+    for i in range(0, len(unique), 500):  # SQLite variable limit
+        chunk = unique[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        for key, row in conn.execute(f"SELECT key, row FROM embeddings WHERE model = ? AND key IN ({marks})", [model_id] + chunk):
+            found[key] = row
+    return found
+
+def lookup(keys: Sequence[str], model_id: str) -> Dict[str, int]:
+    """key -> row for keys already stored."""
+    conn = _connect()
+    found = _lookup(conn, keys, model_id)
+    conn.close()
+    return found
+
+def model_dim(model_id: str) -> Optional[int]:
+    conn = _connect()
+    row = conn.execute("SELECT dim FROM models WHERE model = ?", (model_id,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def put(keys: Sequence[str], vectors: np.ndarray, model_id: str) -> Dict[str, int]:
+    """Append vectors (as float16) for keys not stored yet; returns key -> row for all keys."""
+    dim = vectors.shape[1]
+    path = _vectors_path(model_id, dim)
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")  # one writer allocates rows at a time
+        rows = _lookup(conn, keys, model_id)  # another process may have stored some meanwhile
+        new = [(key, i) for i, key in enumerate(keys) if key not in rows]
+        model = conn.execute("SELECT dim, rows FROM models WHERE model = ?", (model_id,)).fetchone()
+        if model and model[0] != dim:
+            raise ValueError(f"{model_id}: stored vectors have dim {model[0]}, got {dim}")
+        start = model[1] if model else 0
+        if new:
+            data = np.ascontiguousarray(vectors[[i for _, i in new]], dtype=np.float16)
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(start * dim * 2)
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())  # data before index: readers never see a row without its vector
+            now = datetime.now().isoformat()
+            added = {key: start + j for j, (key, _) in enumerate(new)}
+            conn.executemany("INSERT INTO embeddings (key, model, row, created_at) VALUES (?, ?, ?, ?)",
+                             [(key, model_id, row, now) for key, row in added.items()])
+            conn.execute("INSERT OR REPLACE INTO models (model, dim, rows) VALUES (?, ?, ?)", (model_id, dim, start + len(new)))
+            rows.update(added)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return rows
+
+def embed_cached(texts: Sequence[str], encode: Callable[[List[str]], np.ndarray], model_id: str) -> np.ndarray:
+    """Embeddings for texts (float32), calling encode() only for texts not stored under model_id.
+
+    encode(list of texts) -> (n x dim) array. Identical texts in one call are encoded once.
+    """
+    keys = [text_key(t, model_id) for t in texts]
+    rows = lookup(keys, model_id)
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in rows and key not in missing:
+            missing[key] = text
+    if missing:
+        fresh = np.asarray(encode(list(missing.values())), dtype=np.float32)
+        rows.update(put(list(missing), fresh, model_id))
+    dim = model_dim(model_id)
+    if not keys:
+        return np.zeros((0, dim or 0), dtype=np.float32)
+    return _read_rows(_vectors_path(model_id, dim), dim, np.array([rows[k] for k in keys]))
+
+def stats() -> Dict[str, int]:
+    conn = _connect()
+    counts = dict(conn.execute("SELECT model, rows FROM models").fetchall())
+    conn.close()
+    return counts
+
+# Test stub
+if __name__ == "__main__":
+    print(f"Embedding store {store_dir}: {stats()}")
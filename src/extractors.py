@@ -0,0 +1,391 @@
+import os
+import re
+import sys
+import html
+import time
+import tempfile
+import threading
+import zipfile
+import importlib.util
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import PyPDF2
+from PyPDF2 import PdfReader
+import tomllib
+from src import text_cache
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+attach_cfg = config.get("attachments", {})
+extract_cfg = config.get("extractors", {})
+
+# Extractor registry: the type is sniffed from magic bytes (Content-Type on SAM attachments is
+# often wrong), then the first installed backend in the [extractors] preference list for that
+# type runs; later backends are fallbacks when it raises. Every call is timed per backend.
+Source = Union[str, BinaryIO]  # file path (blob store) or seekable binary stream (zip member)
+
+SNIFF_BYTES = 2048
+
+@contextmanager
+def _open(source: Source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        source.seek(0)
+        with nullcontext(source) as f:
+            yield f
+        source.seek(0)
+
+def _read(source: Source) -> bytes:
+    with _open(source) as f:
+        return f.read()
+
+def _decode(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("cp1252", errors="replace")
+
+def _looks_like_text(head: bytes) -> bool:
+    if b"\x00" in head:
+        return False
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return e.start >= len(head) - 3  # multibyte char cut by the sniff window
+    return True
+
+def sniff(source: Source, hint: str = "") -> Optional[str]:
+    """Type from magic bytes: pdf, docx, xlsx, zip, html, text; None if unsupported.
+    hint (Content-Type or file name) only breaks the tie between html and plain text."""
+    with _open(source) as f:
+        head = f.read(SNIFF_BYTES)
+    if head.startswith(b"PK\x03\x04"):  # before the loose PDF check: a stored PDF member shows its header too
+        try:
+            with zipfile.ZipFile(source) as zf:
+                names = set(zf.namelist())
+        except zipfile.BadZipFile:
+            return None
+        if "word/document.xml" in names:
+            return "docx"
+        if "xl/workbook.xml" in names:
+            return "xlsx"
+        return "zip"
+    if b"%PDF-" in head[:1024]:  # some generators prepend junk before the header
+        return "pdf"
+    if not _looks_like_text(head):
+        return None  # includes legacy OLE .doc/.xls (D0 CF 11 E0)
+    lower = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if lower.startswith(b"<!doctype html") or b"<html" in lower[:1024] or b"<body" in lower:
+        return "html"
+    if "htm" in hint.lower() and lower.startswith(b"<"):
+        return "html"
+    return "text"
+
+
+# --- Backend registry ---
+
+_BACKENDS: Dict[str, Dict[str, Callable[[Source], Optional[str]]]] = defaultdict(dict)
+
+def register(kind: str, name: str, requires: str = None):
+    """Decorator: add func(source) -> text as backend `name` for `kind`; skipped if the
+    optional module `requires` is not installed."""
+    def wrap(func):
+        if requires is None or importlib.util.find_spec(requires) is not None:
+            _BACKENDS[kind][name] = func
+        return func
+    return wrap
+
+def backends_for(kind: str) -> List[Tuple[str, Callable]]:
+    """Installed backends for kind, in [extractors] preference order (unlisted ones last)."""
+    available = _BACKENDS.get(kind, {})
+    order = [n for n in extract_cfg.get(kind, []) if n in available]
+    order += [n for n in available if n not in order]
+    return [(n, available[n]) for n in order]
+
+
+# --- Timing counters: (kind, backend) -> calls, seconds, failures ---
+
+_timings = defaultdict(lambda: [0, 0.0, 0])
+_timings_lock = threading.Lock()
+if hasattr(os, "register_at_fork"):  # forked pool workers must not re-report the parent's counts
+    os.register_at_fork(after_in_child=lambda: _timings.clear())
+
+def _record(kind: str, backend: str, seconds: float, failed: bool) -> None:
+    with _timings_lock:
+        stat = _timings[(kind, backend)]
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] += int(failed)
+
+def drain_timings() -> Dict[Tuple[str, str], List]:
+    """Return and reset this process's counters (pool workers ship them back to the parent)."""
+    with _timings_lock:
+        stats = {k: list(v) for k, v in _timings.items()}
+        _timings.clear()
+    return stats
+
+def merge_timings(stats: Dict[Tuple[str, str], List]) -> None:
+    with _timings_lock:
+        for key, (calls, seconds, failures) in stats.items():
+            stat = _timings[key]
+            stat[0] += calls
+            stat[1] += seconds
+            stat[2] += failures
+
+def timing_report() -> str:
+    with _timings_lock:
+        rows = sorted(_timings.items())
+    lines = [f"{'type':<6} {'backend':<12} {'calls':>6} {'fail':>5} {'avg ms':>9}"]
+    for (kind, backend), (calls, seconds, failures) in rows:
+        lines.append(f"{kind:<6} {backend:<12} {calls:>6} {failures:>5} {1000 * seconds / max(calls, 1):>9.1f}")
+    return "\n".join(lines)
+
+
+def extract(source: Source, hint: str = "", kind: str = None, backend: str = None) -> Optional[str]:
+    """Text of a document (None if empty or unsupported). Raises the last backend error if
+    every backend for the type failed. backend forces one backend (e.g. for benchmarking)."""
+    kind = kind or sniff(source, hint)
+    if not kind:
+        return None
+    candidates = [(n, f) for n, f in backends_for(kind) if backend is None or n == backend]
+    error = None
+    for name, func in candidates:
+        start = time.perf_counter()
+        try:
+            text = func(source)
+        except Exception as e:
+            _record(kind, name, time.perf_counter() - start, True)
+            print(f"Extractor {kind}/{name} failed: {e}")
+            error = e
+            continue
+        _record(kind, name, time.perf_counter() - start, False)
+        return text.strip() if text and text.strip() else None
+    if error is not None:
+        raise error
+    return None
+
+def version() -> str:
+    """Cache version for extract(): this module's code, library versions, page budget, backend order
+    and - only when early stop uses them - the filter keywords."""
+    installed = {kind: [n for n, _ in backends_for(kind)] for kind in sorted(_BACKENDS)}
+    keywords = repr(_KEYWORD_PATTERNS) if PAGE_BUDGET["stop_after_hits"] else ""
+    return text_cache.code_version(sys.modules[__name__], PyPDF2.__version__, repr(PAGE_BUDGET),
+                                   keywords, repr(installed))
+
+
+# --- PDF ---
+
+# Page budget for lazy extraction: the first max_pages pages, plus pages the PDF outline points
+# at for the sections that carry the bid signal (Section L/M etc.). Extraction stops once
+# stop_after_hits distinct filter keywords have been seen. 0 disables either limit.
+PAGE_BUDGET = {
+    "max_pages": attach_cfg.get("max_pages", 25),
+    "index_sections": [s.lower() for s in attach_cfg.get("index_sections", [])],
+    "stop_after_hits": attach_cfg.get("stop_after_hits", 0),
+}
+_KEYWORD_PATTERNS = [re.compile(rf'\b{re.escape(kw.lower())}\b') for kw in config.get("filters", {}).get("keywords", [])]
+
+def _outline_pages(reader: PdfReader, sections: List[str]) -> List[int]:
+    """Page numbers of outline (bookmark) entries whose title mentions one of `sections`."""
+    pages = []
+
+    def walk(items):
+        for item in items:
+            if isinstance(item, list):
+                walk(item)
+                continue
+            title = (getattr(item, "title", "") or "").lower()
+            if any(section in title for section in sections):
+                try:
+                    pages.append(reader.get_destination_page_number(item))
+                except Exception:
+                    pass  # Broken destination: skip the bookmark
+    try:
+        walk(reader.outline)
+    except Exception:
+        pass  # Malformed or missing outline: first-N pages only
+    return pages
+
+def iter_pdf_pages(reader: PdfReader, max_pages: int = 0, index_sections: List[str] = ()) -> Iterator[str]:
+    """Yield page text lazily, in page order: the first max_pages pages plus outline-indexed
+    section pages (and the page after each, as sections rarely fit one page)."""
+    total = len(reader.pages)
+    if max_pages and max_pages < total:
+        wanted = set(range(max_pages))
+        for page_no in _outline_pages(reader, index_sections) if index_sections else []:
+            wanted.update(p for p in (page_no, page_no + 1) if p < total)
+        page_numbers = sorted(wanted)
+    else:
+        page_numbers = range(total)
+    for page_no in page_numbers:
+        yield reader.pages[page_no].extract_text() or ""
+
+def _join_pages(pages: Iterable[str], stop_after_hits: int = 0) -> str:
+    """Join page texts; stops pulling pages once stop_after_hits distinct keywords have matched."""
+    texts, seen = [], set()
+    for text in pages:
+        texts.append(text)
+        if stop_after_hits:
+            lower = text.lower()
+            seen.update(i for i, pattern in enumerate(_KEYWORD_PATTERNS) if i not in seen and pattern.search(lower))
+            if len(seen) >= stop_after_hits:
+                break
+    return "\n".join(texts)
+
+def extract_pdf_pages(reader: PdfReader, max_pages: int = 0, index_sections: List[str] = (),
+                      stop_after_hits: int = 0) -> Optional[str]:
+    """Budgeted extraction; stops reading once stop_after_hits distinct keywords have matched."""
+    text = _join_pages(iter_pdf_pages(reader, max_pages, index_sections), stop_after_hits)
+    return text.strip() if text.strip() else None
+
+@register("pdf", "pypdf2")
+def _pdf_pypdf2(source: Source) -> Optional[str]:
+    return extract_pdf_pages(PdfReader(source), **PAGE_BUDGET)
+
+@register("pdf", "pdfminer", requires="pdfminer")
+def _pdf_pdfminer(source: Source) -> Optional[str]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    max_pages = PAGE_BUDGET["max_pages"]
+    pages = extract_pages(source, page_numbers=set(range(max_pages)) if max_pages else None)  # lazy; no outline lookup
+    texts = ("".join(el.get_text() for el in page if isinstance(el, LTTextContainer)) for page in pages)
+    return _join_pages(texts, PAGE_BUDGET["stop_after_hits"])
+
+
+# --- Office (DOCX, XLSX) ---
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+S_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+@register("docx", "python-docx", requires="docx")
+def _docx_python_docx(source: Source) -> Optional[str]:
+    from docx import Document
+    doc = Document(source)
+    parts = [p.text for p in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            parts.append("\t".join(cell.text for cell in row.cells))
+    return "\n".join(parts)
+
+@register("docx", "docx-xml")
+def _docx_xml(source: Source) -> Optional[str]:
+    """No-dependency fallback: stream word/document.xml, one line per paragraph."""
+    paragraphs, current = [], []
+    with zipfile.ZipFile(source) as zf, zf.open("word/document.xml") as xml:
+        for _, el in ET.iterparse(xml):
+            if el.tag == W_NS + "t":
+                current.append(el.text or "")
+            elif el.tag == W_NS + "tab":
+                current.append("\t")
+            elif el.tag == W_NS + "p":
+                paragraphs.append("".join(current))
+                current = []
+                el.clear()
+    return "\n".join(paragraphs)
+
+@register("xlsx", "xlsx-xml")
+def _xlsx_xml(source: Source) -> Optional[str]:
+    """Cell values of every sheet (shared strings resolved), one tab-separated line per row."""
+    with zipfile.ZipFile(source) as zf:
+        names = zf.namelist()
+        shared = []
+        if "xl/sharedStrings.xml" in names:
+            with zf.open("xl/sharedStrings.xml") as xml:
+                for _, el in ET.iterparse(xml):
+                    if el.tag == S_NS + "si":
+                        shared.append("".join(t.text or "" for t in el.iter(S_NS + "t")))
+                        el.clear()
+        lines = []
+        for sheet in sorted(n for n in names if n.startswith("xl/worksheets/sheet") and n.endswith(".xml")):
+            with zf.open(sheet) as xml:
+                for _, el in ET.iterparse(xml):
+                    if el.tag != S_NS + "row":
+                        continue
+                    cells = []
+                    for c in el.iter(S_NS + "c"):
+                        if c.get("t") == "inlineStr":
+                            cells.append("".join(t.text or "" for t in c.iter(S_NS + "t")))
+                            continue
+                        v = c.find(S_NS + "v")
+                        if v is None or v.text is None:
+                            continue
+                        cells.append(shared[int(v.text)] if c.get("t") == "s" else v.text)
+                    if cells:
+                        lines.append("\t".join(cells))
+                    el.clear()
+    return "\n".join(lines)
+
+
+# --- HTML / text ---
+
+def strip_html_tags(raw_html: str) -> str:
+    """Remove script/style blocks and tags, unescape entities, collapse whitespace."""
+    text = re.sub(r"(?is)<(script|style)\b.*?</\1>", " ", raw_html)
+    text = re.sub(r"<[^>]+>", " ", text)
+    return re.sub(r"\s+", " ", html.unescape(text)).strip()
+
+@register("html", "lxml", requires="lxml")
+def _html_lxml(source: Source) -> Optional[str]:
+    import lxml.html
+    doc = lxml.html.document_fromstring(_read(source))
+    for el in doc.xpath("//script|//style"):
+        el.drop_tree()
+    return re.sub(r"\s+", " ", doc.text_content())
+
+@register("html", "regex")
+def _html_regex(source: Source) -> Optional[str]:
+    return strip_html_tags(_decode(_read(source)))
+
+@register("text", "plain")
+def _text_plain(source: Source) -> Optional[str]:
+    return _decode(_read(source))
+
+
+# --- ZIP: members are streamed out one at a time and dispatched by their own sniffed type ---
+
+@register("zip", "zipfile")
+def _zip_members(source: Source) -> Optional[str]:
+    max_members = extract_cfg.get("zip_max_members", 50)
+    max_member_bytes = int(extract_cfg.get("zip_max_member_mb", 50) * 1024 * 1024)
+    spool_bytes = int(config.get("http_client", {}).get("spool_mb", 8) * 1024 * 1024)
+    parts = []
+    with zipfile.ZipFile(source) as zf:
+        members = [i for i in zf.infolist() if not i.is_dir()]
+        for info in members[:max_members]:
+            if info.file_size > max_member_bytes:
+                print(f"Skipping zip member {info.filename}: {info.file_size} bytes")
+                continue
+            # Spool each member (RAM, then disk above spool_mb) so PDF/DOCX readers can seek
+            # without re-inflating; only one member is expanded at a time
+            with zf.open(info) as member, tempfile.SpooledTemporaryFile(max_size=spool_bytes) as spooled:
+                while chunk := member.read(64 * 1024):
+                    spooled.write(chunk)
+                    if spooled.tell() > max_member_bytes:  # header lied (zip bomb)
+                        break
+                else:
+                    kind = sniff(spooled, info.filename)
+                    if kind == "zip":
+                        continue  # nested archives are not expanded
+                    try:
+                        text = extract(spooled, info.filename, kind=kind) if kind else None
+                    except Exception as e:
+                        print(f"Zip member {info.filename} failed: {e}")
+                        continue
+                    if text:
+                        parts.append(f"== {info.filename} ==\n{text}")
+    return "\n\n".join(parts)
+
+
+# Test stub: extract files given on the command line, then print backend timings
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        text = extract(path, hint=path)
+        print(f"{path}: {sniff(path, path)}, {len(text or '')} chars")
+    print(timing_report())
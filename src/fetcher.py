@@ -1,9 +1,17 @@
 import os
-import requests
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 import tomllib
-from src.parser import parse_attachment  # Chain to parse
+from src.parser import download_attachment, parse_attachments  # Chain to parse
+from src.ratelimit import KeyScheduler
+from src import http_cache, http_client
 
 # Load config with robust path (works for direct run or import)
 config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
@@ -12,6 +20,8 @@ with open(config_path, "rb") as f:
 
 # Interpolate env vars (handles multiple if needed)
 def interpolate_env(val):
+    if isinstance(val, list):
+        return [interpolate_env(v) for v in val]
     if isinstance(val, str) and '$env:' in val:
         env_key = val.split('$env:')[1].split()[0]  # Extract key like 'SAM_API_KEY_1'
         return os.environ.get(env_key, val)  # Fallback to literal if env var missing
@@ -22,70 +32,290 @@ for section in config:
     for key, value in config[section].items():
         config[section][key] = interpolate_env(value)
 
-def fetch_sam_opps(limit: int = None, posted_from: str = None, posted_to: str = None, parse_attachments: bool = False) -> List[Dict]:
-    limit = limit or config["api"]["limit"]
-    posted_from = posted_from or config["api"]["posted_from"]
-    posted_to = posted_to or config["api"]["posted_to"]
-    api_key = config['sam_api']['api_key']
-    if not api_key or api_key.startswith('$env:'):
-        # Mock data matching real flat schema
-        mock_attach = "https://example.gov/mock_rfp.pdf"
-        mock_naics = config["filters"]["naics_codes"]
-        today = datetime.now()
-        return [
-            {
-                "noticeId": f"mock_{i}",
-                "title": f"ClearTrend RFP {i}",
-                "description": f"https://api.sam.gov/prod/opportunities/v1/noticedesc?noticeid=mock_{i}&api_key={api_key}",  # Mock desc URL
-                "naicsCode": mock_naics[i % len(mock_naics)],
-                "typeOfSetAside": "SBA" if i % 2 == 0 else None,
-                "pointOfContact": [{"fullName": f"POC {i}", "type": "primary", "email": f"poc{i}@example.com"}],
-                "responseDeadLine": (today + timedelta(days=40 + i*5)).strftime('%Y-%m-%d %H:%M:%S') if i % 2 else None,
-                "postedDate": today.strftime('%Y-%m-%d'),
-                "resourceLinks": [mock_attach] if i % 3 == 0 else [],
-                "solicitationNumber": f"SOL-{i:04d}",
-            }
-            for i in range(limit)
-        ]
+SAM_SEARCH_URL = "https://api.sam.gov/prod/opportunities/v2/search"
+SAM_MAX_PAGE_SIZE = 1000  # API rejects limit > 1000 per request
+MOCK_RECORDS = 5  # mock opps when no API key is set and no limit is given
 
-    # Real API call
-    url = "https://api.sam.gov/prod/opportunities/v2/search"
+def _sam_keys() -> List[str]:
+    """Usable API keys ([sam_api] api_keys, else api_key); unresolved $env: refs are dropped."""
+    keys = config['sam_api'].get('api_keys') or [config['sam_api'].get('api_key')]
+    return [k for k in dict.fromkeys(keys) if k and not k.startswith('$env:')]
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> KeyScheduler:
+    """Process-wide key scheduler shared by every SAM request (search, notice, description)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = KeyScheduler(
+                _sam_keys(),
+                rate_per_sec=config['sam_api'].get('rate_per_sec', 1.0),
+                burst=config['sam_api'].get('burst', 2),
+                daily_quota=config['sam_api'].get('daily_quota', 1000),
+            )
+        return _scheduler
+
+def _sam_get(url: str, params: Dict, headers: Dict = None):
+    """GET an api.sam.gov endpoint with a scheduler-assigned key.
+
+    429s go back to the scheduler (which blocks that key per Retry-After) and the request is
+    retried on whichever key is free next; 5xx retries with jittered exponential backoff.
+    """
+    scheduler = get_scheduler()
+    max_retries = config['sam_api'].get('max_retries', 5)
+    for attempt in range(1, max_retries + 1):
+        key = scheduler.acquire()
+        resp = http_client.get(url, params={**params, "api_key": key}, headers=headers, timeout=config["api"].get("timeout", 60))
+        scheduler.report(key, resp.status_code, resp.headers)
+        if attempt < max_retries:
+            if resp.status_code == 429:
+                continue
+            if 500 <= resp.status_code < 600:
+                time.sleep(random.uniform(0, min(30.0, 2 ** (attempt - 1))))
+                continue
+        if resp.status_code >= 400:
+            resp.raise_for_status()
+        return resp
+
+def _mock_opps(limit: int, api_key: str) -> List[Dict]:
+    # Mock data matching real flat schema
+    mock_attach = "https://example.gov/mock_rfp.pdf"
+    mock_naics = config["filters"]["naics_codes"]
+    today = datetime.now()
+    return [
+        {
+            "noticeId": f"mock_{i}",
+            "title": f"ClearTrend RFP {i}",
+            "description": f"https://api.sam.gov/prod/opportunities/v1/noticedesc?noticeid=mock_{i}&api_key={api_key}",  # Mock desc URL
+            "naicsCode": mock_naics[i % len(mock_naics)],
+            "typeOfSetAside": "SBA" if i % 2 == 0 else None,
+            "pointOfContact": [{"fullName": f"POC {i}", "type": "primary", "email": f"poc{i}@example.com"}],
+            "responseDeadLine": (today + timedelta(days=40 + i*5)).strftime('%Y-%m-%d %H:%M:%S') if i % 2 else None,
+            "postedDate": today.strftime('%Y-%m-%d'),
+            "resourceLinks": [mock_attach] if i % 3 == 0 else [],
+            "solicitationNumber": f"SOL-{i:04d}",
+        }
+        for i in range(limit)
+    ]
+
+def _fetch_sam_page(posted_from: str, posted_to: str, offset: int, page_size: int) -> Dict:
+    """One search request; returns the raw JSON (opportunitiesData + totalRecords)."""
     params = {
-        "limit": limit,
+        "limit": page_size,
+        "offset": offset,
         "postedFrom": posted_from,  # MM/dd/yyyy
         "postedTo": posted_to,      # MM/dd/yyyy
-        "api_key": api_key
     }
-    try:
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        opps = data.get("opportunitiesData", [])
+    return _sam_get(SAM_SEARCH_URL, params).json()
+
+def description_cache_url(desc_url: str) -> str:
+    """Cache key of a noticedesc URL: the URL without any embedded api_key."""
+    parts = urlsplit(desc_url)
+    params = {k: v for k, v in parse_qsl(parts.query) if k != "api_key"}
+    return f"{urlunsplit(parts._replace(query=''))}?{urlencode(params)}"
+
+def _fetch_description(desc_url: str) -> str:
+    # noticedesc counts against the key quota too; drop any embedded key and let the scheduler pick.
+    # Cached without the key, revalidated with ETag/Last-Modified (optionally in the background).
+    parts = urlsplit(desc_url)
+    params = {k: v for k, v in parse_qsl(parts.query) if k != "api_key"}
+    base_url = urlunsplit(parts._replace(query=""))
+    entry = http_cache.fetch(
+        description_cache_url(desc_url),
+        max_age=http_cache.cache_cfg.get("description_max_age_hours", 24) * 3600,
+        stale_while_revalidate=http_cache.cache_cfg.get("stale_while_revalidate", False),
+        getter=lambda headers, timeout: _sam_get(base_url, params, headers),
+    )
+    return http_cache.read_text(entry) if entry else ""
+
+def enrich_opps(opps: List[Dict]) -> None:
+    """Parse first attachment and fetch description text in place, as one batch.
+
+    Attachments go through parse_attachments (download threads + extraction processes);
+    descriptions are fetched on a small thread pool alongside.
+    """
+    attach_opps = [(opp, opp["resourceLinks"][0]) for opp in opps if opp.get("resourceLinks")]
+    desc_opps = [opp for opp in opps if opp.get("description")]
+    with ThreadPoolExecutor(max_workers=config["api"].get("max_workers", 4)) as pool:
+        desc_texts = pool.map(lambda opp: _fetch_description(opp["description"]), desc_opps)
+        parsed = parse_attachments([url for _, url in attach_opps])
+        for opp, text in zip(desc_opps, desc_texts):
+            opp["description_text"] = text
+    for opp, attach_url in attach_opps:
+        opp["parsed_doc_text"] = parsed.get(attach_url) or ""
+
+def revalidate_content(leads: List[Dict]) -> None:
+    """Bring the cached descriptions/attachments of leads up to date (conditional requests,
+    none while fresh). Only URLs already in the cache are checked: content the last scoring
+    never fetched is not downloaded just to compare it."""
+    cached = http_cache.lookup_many([description_cache_url(lead["desc_url"]) for lead in leads if lead.get("desc_url")] +
+                                    [lead["attach_url"] for lead in leads if lead.get("attach_url")])
+    for lead in leads:
+        desc_url, attach_url = lead.get("desc_url"), lead.get("attach_url")
+        if desc_url and description_cache_url(desc_url) in cached:
+            _fetch_description(desc_url)
+        if attach_url and attach_url in cached:
+            download_attachment(attach_url)
+
+def incremental_window(watermark: Optional[str], overlap_days: int = None) -> Tuple[str, str]:
+    """(posted_from, posted_to) in MM/dd/yyyy for a delta fetch: watermark minus the overlap
+    margin through today. Without a watermark, falls back to the configured [api] window."""
+    if not watermark:
+        return config["api"]["posted_from"], config["api"]["posted_to"]
+    overlap_days = config["api"].get("overlap_days", 2) if overlap_days is None else overlap_days
+    start = datetime.strptime(watermark[:10], '%Y-%m-%d') - timedelta(days=overlap_days)
+    return start.strftime('%m/%d/%Y'), datetime.now().strftime('%m/%d/%Y')
+
+def _split_window(posted_from: str, posted_to: str) -> Optional[List[Tuple[str, str]]]:
+    """Halve a MM/dd/yyyy window by whole days; None if it is already a single day."""
+    start, end = datetime.strptime(posted_from, '%m/%d/%Y'), datetime.strptime(posted_to, '%m/%d/%Y')
+    if start >= end:
+        return None
+    mid = start + timedelta(days=(end - start).days // 2)
+    return [(posted_from, mid.strftime('%m/%d/%Y')), ((mid + timedelta(days=1)).strftime('%m/%d/%Y'), posted_to)]
+
+def plan_windows(posted_from: str, posted_to: str, page_size: int, max_records: int = None, max_workers: int = None, stats: Dict = None) -> List[Dict]:
+    """Probe a posted window and recursively bisect it until each sub-window's totalRecords
+    fits max_records (the most the API lets us page through). Probes run in parallel per level
+    and their first page is kept, so a window that fits costs nothing extra.
+
+    Returns [{"from", "to", "total", "first"}] in date order.
+    """
+    max_records = max_records or config["api"].get("max_window_records", 10000)
+    max_workers = max_workers or config["api"].get("max_workers", 4)
+    stats = {} if stats is None else stats
+    stats.setdefault("errors", 0)
+
+    def probe(window):
+        try:
+            return window, _fetch_sam_page(window[0], window[1], 0, page_size)
+        except Exception as e:
+            print(f"SAM fetch error for window {window[0]}-{window[1]}: {e}")
+            stats["errors"] += 1
+            return window, None
+
+    planned, todo = [], [(posted_from, posted_to)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while todo:
+            next_level = []
+            for window, data in pool.map(probe, todo):
+                if data is None:
+                    continue
+                total = int(data.get("totalRecords") or 0)
+                halves = _split_window(*window) if total > max_records else None
+                if halves:
+                    next_level.extend(halves)
+                    continue
+                if total > max_records:
+                    print(f"Warning: single day {window[0]} has {total} records; only the first {max_records} can be paged")
+                planned.append({"from": window[0], "to": window[1], "total": total, "first": data.get("opportunitiesData", []) or []})
+            todo = next_level
+    planned.sort(key=lambda w: datetime.strptime(w["from"], '%m/%d/%Y'))
+    if len(planned) > 1:
+        print(f"Window {posted_from}-{posted_to} split into {len(planned)} sub-windows of <= {max_records} records")
+    return planned
+
+def fetch_sam_opps_iter(limit: int = None, posted_from: str = None, posted_to: str = None, parse_attachments: bool = False, max_workers: int = None, stats: Dict = None) -> Iterator[List[Dict]]:
+    """Paginated SAM search yielding one page (list of opps) at a time, in date/offset order.
+
+    plan_windows learns totalRecords and bisects windows too large to page through; the
+    remaining offset pages of every sub-window are then fetched concurrently (max_workers)
+    with at most max_workers pages in flight, so memory stays bounded by page size rather
+    than window size. Results are deduped by noticeId. `limit` caps the total returned
+    (default [api] limit; 0 = every record of the window).
+    If a `stats` dict is passed it is filled with total/pages/windows/errors as the fetch runs,
+    plus truncated (records of the window left unfetched) and mock (no API key: mock data).
+    """
+    stats = {} if stats is None else stats
+    stats.update(total=0, pages=0, windows=0, errors=0, truncated=False, mock=False)
+    limit = config["api"].get("limit", 0) if limit is None else limit
+    posted_from = posted_from or config["api"]["posted_from"]
+    posted_to = posted_to or config["api"]["posted_to"]
+    max_workers = max_workers or config["api"].get("max_workers", 4)
+    max_records = config["api"].get("max_window_records", 10000)
+    page_size = min(config["api"].get("page_size", SAM_MAX_PAGE_SIZE), SAM_MAX_PAGE_SIZE, limit or SAM_MAX_PAGE_SIZE)
+    if not _sam_keys():
+        mock = _mock_opps(limit or MOCK_RECORDS, config['sam_api']['api_key'])
+        stats.update(total=len(mock), pages=-(-len(mock) // page_size), windows=1, mock=True)
+        for start in range(0, len(mock), page_size):
+            yield mock[start:start + page_size]
+        return
+
+    # Real API call
+    windows = plan_windows(posted_from, posted_to, page_size, max_records, max_workers, stats)
+    total = sum(w["total"] for w in windows)
+    wanted = min(total, limit) if limit else total
+    if total > wanted:
+        print(f"Warning: window {posted_from}-{posted_to} has {total} records; only the first {limit} are fetched (raise [api] limit or --limit)")
+    tasks = [(w, offset) for w in windows for offset in range(0, min(w["total"], max_records), page_size)]
+    # Cut by [api] limit, or a single day past max_window_records: part of the window is never seen
+    truncated = total > wanted or any(w["total"] > max_records for w in windows)
+    stats.update(total=total, pages=len(tasks), windows=len(windows), truncated=truncated)
+    print(f"SAM fetch: {wanted} / {total} records in {len(tasks)} pages")
+
+    def fetch_page(window, offset):
+        if offset == 0:
+            opps = window.pop("first")  # Already fetched by the planner's probe
+        else:
+            try:
+                opps = _fetch_sam_page(window["from"], window["to"], offset, page_size).get("opportunitiesData", []) or []
+            except Exception as page_err:
+                print(f"SAM page error at {window['from']}-{window['to']} offset {offset}: {page_err}")
+                stats["errors"] += 1
+                return []
         if parse_attachments:
-            for opp in opps:
-                resource_links = opp.get("resourceLinks", [])
-                attach_url = resource_links[0] if resource_links else None
-                if attach_url:
-                    try:
-                        opp["parsed_doc_text"] = parse_attachment(attach_url)
-                    except Exception as parse_err:
-                        print(f"Parse error for {attach_url}: {parse_err}")
-                        opp["parsed_doc_text"] = ""
-                # Optionally fetch description text from desc URL
-                desc_url = opp.get("description")
-                if desc_url and "?api_key=" not in desc_url:
-                    desc_url += f"&api_key={api_key}"  # Append if missing
-                    try:
-                        desc_resp = requests.get(desc_url)
-                        desc_resp.raise_for_status()
-                        opp["description_text"] = desc_resp.text
-                    except Exception as desc_err:
-                        print(f"Desc fetch error for {desc_url}: {desc_err}")
-                        opp["description_text"] = ""
+            enrich_opps(opps)
         return opps
-    except Exception as e:
-        print(f"SAM fetch error: {e}")
-        return []
+
+    seen_ids = set()
+    yielded = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        remaining = iter(tasks)
+        for task in islice(remaining, max_workers):
+            pending.append(pool.submit(fetch_page, *task))
+        while pending and yielded < wanted:
+            fut = pending.popleft()
+            next_task = next(remaining, None)
+            if next_task is not None:
+                pending.append(pool.submit(fetch_page, *next_task))
+            page = []
+            for opp in fut.result():
+                notice_id = opp.get("noticeId")
+                if notice_id in seen_ids:
+                    continue
+                seen_ids.add(notice_id)
+                page.append(opp)
+            page = page[:wanted - yielded]
+            yielded += len(page)
+            yield page
+        for fut in pending:
+            fut.cancel()
+
+def fetch_sam_opps(limit: int = None, posted_from: str = None, posted_to: str = None, parse_attachments: bool = False, max_workers: int = None) -> List[Dict]:
+    """Whole-window fetch; collects fetch_sam_opps_iter pages into one list."""
+    opps = []
+    for page in fetch_sam_opps_iter(limit, posted_from, posted_to, parse_attachments, max_workers):
+        opps.extend(page)
+    return opps
+
+def enrich_leads(leads: List[Dict], max_workers: int = None) -> None:
+    """Targeted enrichment of mapped leads, in place: description text and parsed first
+    attachment straight from each lead's desc_url/attach_url, as enrich_opps does for raw opps.
+    No notice lookup, so no search request (key quota) is spent per lead."""
+    max_workers = max_workers or config["api"].get("max_workers", 4)
+    desc_leads = [lead for lead in leads if lead.get("desc_url")]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        desc_texts = pool.map(lambda lead: _fetch_description(lead["desc_url"]), desc_leads)
+        parsed = parse_attachments([lead["attach_url"] for lead in leads if lead.get("attach_url")])
+        for lead, text in zip(desc_leads, desc_texts):
+            if text:
+                lead["description"] += " " + text
+    for lead in leads:
+        if lead.get("attach_url"):
+            lead["parsed_doc_text"] = parsed.get(lead["attach_url"]) or ""
 
 def map_to_lead(item: Dict) -> Dict:
     poc_list = item.get("pointOfContact", [{}])
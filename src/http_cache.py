@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional
+import tomllib
+from src import blobstore, http_client
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+cache_cfg = config.get("http_cache", {})
+
+# Local HTTP cache: url -> (sha256 body in blobstore, ETag, Last-Modified, Content-Type, fetched_at).
+# Fresh entries (younger than max_age) are served without a request; stale ones are revalidated
+# with If-None-Match / If-Modified-Since and a 304 just refreshes fetched_at.
+cache_path = cache_cfg.get("path") or os.path.join(os.path.dirname(__file__), '..', 'data', 'http_cache.db')
+
+_revalidator = ThreadPoolExecutor(max_workers=cache_cfg.get("revalidate_workers", 2))
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    conn = sqlite3.connect(cache_path, timeout=30)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY,
+            sha256 TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            content_type TEXT,
+            fetched_at TEXT
+        )
+    ''')
+    return conn
+
+def _lookup(url: str) -> Optional[Dict]:
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT * FROM http_cache WHERE url = ?", (url,)).fetchone()
+    conn.close()
+    if not row or not blobstore.touch(row["sha256"]):  # Body evicted: treat as a miss
+        return None
+    return dict(row)
+
+def lookup_many(urls: Iterable[str]) -> Dict[str, Dict]:
+    """url -> cached entry for the urls in the cache (no network), in one query per 500 urls.
+    Only reads: unlike fetch, doesn't move the blobs' LRU clock. Evicted bodies count as misses."""
+    urls = list(dict.fromkeys(u for u in urls if u))
+    found = {}
+    if not urls:
+        return found
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    for i in range(0, len(urls), 500):  # SQLite variable limit
+        chunk = urls[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        for row in conn.execute(f"SELECT * FROM http_cache WHERE url IN ({marks})", chunk):
+            if os.path.exists(blobstore.blob_path(row["sha256"])):
+                found[row["url"]] = dict(row)
+    conn.close()
+    return found
+
+def _store(url: str, resp) -> Dict:
+    if isinstance(resp, http_client.Download):  # Streamed/spooled body: never held whole in RAM
+        sha256 = blobstore.put_file(resp.body, resp.sha256, resp.size)
+        resp.body.close()
+    else:
+        sha256 = blobstore.put_blob(resp.content)
+    entry = {
+        "url": url,
+        "sha256": sha256,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "content_type": resp.headers.get("Content-Type", ""),
+        "fetched_at": datetime.now().isoformat(),
+    }
+    conn = _connect()
+    conn.execute('''
+        INSERT OR REPLACE INTO http_cache (url, sha256, etag, last_modified, content_type, fetched_at)
+        VALUES (:url, :sha256, :etag, :last_modified, :content_type, :fetched_at)
+    ''', entry)
+    conn.commit()
+    conn.close()
+    return entry
+
+def _mark_revalidated(entry: Dict) -> Dict:
+    entry["fetched_at"] = datetime.now().isoformat()
+    conn = _connect()
+    conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (entry["fetched_at"], entry["url"]))
+    conn.commit()
+    conn.close()
+    return entry
+
+def _revalidate(url: str, entry: Optional[Dict], getter: Callable, timeout: float) -> Optional[Dict]:
+    """Conditional GET; returns the (possibly unchanged) entry, or the stale entry on error."""
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    try:
+        resp = getter(headers, timeout)
+        if resp.status_code == 304 and entry:
+            return dict(_mark_revalidated(entry), status="revalidated")
+        resp.raise_for_status()
+        return dict(_store(url, resp), status="fetched")
+    except Exception as e:
+        print(f"HTTP fetch error for {url}: {e}")
+        return dict(entry, status="stale") if entry else None  # stale-if-error
+
+def _background_revalidate(url: str, entry: Dict, getter: Callable, timeout: float) -> None:
+    with _revalidating_lock:
+        if url in _revalidating:
+            return
+        _revalidating.add(url)
+
+    def run():
+        try:
+            _revalidate(url, entry, getter, timeout)
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(url)
+    _revalidator.submit(run)
+
+def fetch(url: str, max_age: float = None, stale_while_revalidate: bool = False, timeout: float = 30,
+          getter: Callable = None, cache_key: str = None, max_bytes: int = None, text_max_bytes: int = None,
+          head_precheck: bool = False) -> Optional[Dict]:
+    """GET through the cache. Returns {"sha256", "content_type", "status", ...} or None on failure.
+
+    max_age: seconds an entry is served without contacting the server (default 0 = always revalidate).
+    stale_while_revalidate: serve a stale entry immediately and revalidate in the background.
+    getter(headers, timeout) -> response lets callers route through their own client (e.g. the
+    SAM key scheduler); cache_key overrides the URL as the index key (e.g. without api_key).
+    The default getter streams via http_client.download with the max_bytes/text_max_bytes/
+    head_precheck ceilings; an oversized body is an error (stale copy or None is returned).
+    """
+    key = cache_key or url
+    getter = getter or (lambda headers, t: http_client.download(
+        url, headers=headers, timeout=t, max_bytes=max_bytes, text_max_bytes=text_max_bytes, head_precheck=head_precheck))
+    entry = _lookup(key)
+    if entry:
+        age = datetime.now() - datetime.fromisoformat(entry["fetched_at"])
+        if max_age and age < timedelta(seconds=max_age):
+            return dict(entry, status="fresh")
+        if stale_while_revalidate:
+            _background_revalidate(key, entry, getter, timeout)
+            return dict(entry, status="stale")
+    return _revalidate(key, entry, getter, timeout)
+
+def read_body(entry: Dict) -> bytes:
+    return blobstore.read_blob(entry["sha256"])
+
+def read_text(entry: Dict) -> str:
+    return read_body(entry).decode("utf-8", errors="replace")
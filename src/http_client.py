@@ -0,0 +1,173 @@
+import os
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+import tomllib
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+client_cfg = config.get("http_client", {})
+
+# One shared HTTP client for every fetch path (SAM search/desc, attachments, summaries):
+# keep-alive pools per host, gzip negotiation, default timeouts. backend = "httpx" switches
+# to httpx.Client (optionally HTTP/2, which needs the h2 package); default is requests.Session.
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": client_cfg.get("user_agent", "cts-leadgen/0.1"),
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+def _build_requests_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=client_cfg.get("pool_hosts", 10),      # hosts with a cached pool
+        pool_maxsize=client_cfg.get("pool_per_host", 16),       # keep-alive connections per host
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+def _build_httpx_client():
+    import httpx  # Optional backend
+    http2 = client_cfg.get("http2", False)
+    if http2:
+        try:
+            import h2  # noqa: F401  httpx needs it for HTTP/2
+        except ImportError:
+            print("http_client: h2 not installed; falling back to HTTP/1.1")
+            http2 = False
+    return httpx.Client(
+        http2=http2,
+        headers=DEFAULT_HEADERS,
+        follow_redirects=True,
+        timeout=client_cfg.get("timeout", 30),
+        limits=httpx.Limits(
+            max_connections=client_cfg.get("pool_hosts", 10) * client_cfg.get("pool_per_host", 16),
+            max_keepalive_connections=client_cfg.get("pool_per_host", 16),
+        ),
+    )
+
+def get_client():
+    """Process-wide client, built on first use from [http_client]."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            backend = client_cfg.get("backend", "requests")
+            if backend == "httpx":
+                try:
+                    _client = _build_httpx_client()
+                except ImportError:
+                    print("http_client: httpx not installed; using requests")
+            if _client is None:
+                _client = _build_requests_session()
+        return _client
+
+def set_client(client) -> None:
+    """Inject a client (anything with a requests-style .get), e.g. a preconfigured session."""
+    global _client
+    with _client_lock:
+        _client = client
+
+def get(url: str, params: Dict = None, headers: Dict = None, timeout: Optional[float] = None):
+    """GET through the shared client. Callers check status themselves (304 is not an error)."""
+    return get_client().get(url, params=params, headers=headers, timeout=timeout or client_cfg.get("timeout", 30))
+
+
+CHUNK_SIZE = 64 * 1024
+
+class ResponseTooLarge(Exception):
+    """Body exceeds the caller's byte ceiling (from Content-Length or while streaming)."""
+
+
+class Download:
+    """Streamed response: body spooled to a temp file (RAM only while under spool_bytes),
+    hashed on the way in. Quacks like a response for status/headers/raise_for_status."""
+
+    def __init__(self, resp, body, size: int, sha256: str, truncated: bool):
+        self.resp = resp
+        self.status_code = resp.status_code
+        self.headers = resp.headers
+        self.body = body
+        self.size = size
+        self.sha256 = sha256
+        self.truncated = truncated
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            self.resp.raise_for_status()
+
+
+def _is_httpx(client) -> bool:
+    return callable(getattr(client, "stream", None))  # requests.Session.stream is a bool flag
+
+@contextmanager
+def _stream(url: str, headers: Dict, timeout: float):
+    client = get_client()
+    if _is_httpx(client):
+        with client.stream("GET", url, headers=headers, timeout=timeout) as resp:
+            yield resp, resp.iter_bytes(CHUNK_SIZE)
+    else:
+        resp = client.get(url, headers=headers, timeout=timeout, stream=True)
+        try:
+            yield resp, resp.iter_content(CHUNK_SIZE)
+        finally:
+            resp.close()
+
+def _content_length(headers) -> Optional[int]:
+    try:
+        return int(headers.get("Content-Length"))
+    except (TypeError, ValueError):
+        return None
+
+def download(url: str, headers: Dict = None, timeout: Optional[float] = None, max_bytes: int = None,
+             text_max_bytes: int = None, head_precheck: bool = False) -> Download:
+    """Streamed GET with a hard byte ceiling.
+
+    max_bytes: oversized bodies raise ResponseTooLarge, checked against HEAD (if head_precheck),
+    then the GET's Content-Length, then the running byte count.
+    text_max_bytes: text/* bodies are cut at this size instead (truncated=True) - enough for a summary.
+    """
+    timeout = timeout or client_cfg.get("timeout", 30)
+    spool_bytes = int(client_cfg.get("spool_mb", 8) * 1024 * 1024)
+    client = get_client()
+    if max_bytes and head_precheck:
+        redirect_kw = {"follow_redirects": True} if _is_httpx(client) else {"allow_redirects": True}
+        try:
+            head = client.head(url, headers=headers, timeout=timeout, **redirect_kw)
+            length = _content_length(head.headers) if head.status_code < 400 else None
+        except Exception:
+            length = None  # HEAD unsupported/failed: rely on the GET checks
+        if length and length > max_bytes:
+            raise ResponseTooLarge(f"{url}: Content-Length {length} > {max_bytes} bytes (HEAD)")
+
+    with _stream(url, headers, timeout) as (resp, chunks):
+        truncate = bool(text_max_bytes) and resp.headers.get("Content-Type", "").lower().startswith("text/")
+        cap = text_max_bytes if truncate else max_bytes
+        length = _content_length(resp.headers)
+        if not truncate and max_bytes and length and length > max_bytes:
+            raise ResponseTooLarge(f"{url}: Content-Length {length} > {max_bytes} bytes")
+        body = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        digest, size, truncated = hashlib.sha256(), 0, False
+        for chunk in chunks:
+            if cap and size + len(chunk) > cap:
+                if not truncate:
+                    body.close()
+                    raise ResponseTooLarge(f"{url}: body exceeds {max_bytes} bytes")
+                chunk, truncated = chunk[:cap - size], True
+            body.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            if truncated:
+                break
+        body.seek(0)
+        return Download(resp, body, size, digest.hexdigest(), truncated)
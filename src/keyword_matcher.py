@@ -0,0 +1,65 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+# Compiled multi-term matcher: built once per keyword list, one scan per document returns
+# keyword hits, exclude hits, risk hits and the word count together. Cost no longer grows
+# with (number of keywords x text length):
+#   - keywords (whole-word, like rf'\b{kw}\b'): the text is tokenized once (\w+, in C) into a
+#     set; single-word keywords are set lookups, multi-word ones are confirmed with their own
+#     regex only when every word is present.
+#   - exclude/risk terms (plain substrings, like `term in text`): one combined alternation,
+#     longest term first, evaluated at every position via lookahead so overlapping terms all hit.
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+class MatchResult(NamedTuple):
+    keyword_hits: List[str]  # distinct keywords matched, in keyword-list order
+    exclude_hits: List[str]
+    risk_hits: List[str]
+    word_count: int
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: Iterable[str], exclude_terms: Iterable[str] = (), risk_terms: Iterable[str] = ()):
+        self.keywords = list(dict.fromkeys(kw.lower() for kw in keywords if kw))
+        self.single = {kw for kw in self.keywords if TOKEN_RE.fullmatch(kw)}
+        # Other keywords: (keyword, words that must all be present, exact whole-word regex)
+        self.phrases = [(kw, set(TOKEN_RE.findall(kw)), re.compile(rf'\b{re.escape(kw)}\b'))
+                        for kw in self.keywords if kw not in self.single]
+
+        self.exclude_terms = list(dict.fromkeys(t.lower() for t in exclude_terms if t))
+        self.risk_terms = list(dict.fromkeys(t.lower() for t in risk_terms if t))
+        terms = sorted(set(self.exclude_terms) | set(self.risk_terms), key=len, reverse=True)
+        self.term_re = re.compile("(?=(" + "|".join(map(re.escape, terms)) + "))") if terms else None
+        # The lookahead reports the longest term at a position; shorter terms that are its
+        # prefixes also occur there
+        self.implied: Dict[str, Tuple[str, ...]] = {t: tuple(s for s in terms if t.startswith(s)) for t in terms}
+
+    def scan(self, text: str) -> MatchResult:
+        lower = (text or "").lower()
+        tokens = TOKEN_RE.findall(lower)
+        present = set(tokens)
+        hits = set(self.single & present)
+        for kw, words, pattern in self.phrases:
+            if words <= present and pattern.search(lower):
+                hits.add(kw)
+        found = set()
+        if self.term_re is not None:
+            for m in self.term_re.finditer(lower):
+                found.update(self.implied[m.group(1)])
+                if len(found) == len(self.implied):
+                    break  # every term already hit
+        return MatchResult(
+            keyword_hits=[kw for kw in self.keywords if kw in hits],
+            exclude_hits=[t for t in self.exclude_terms if t in found],
+            risk_hits=[t for t in self.risk_terms if t in found],
+            word_count=len(tokens),
+        )
+
+
+@lru_cache(maxsize=32)
+def build_matcher(keywords: Tuple[str, ...], exclude_terms: Tuple[str, ...] = (), risk_terms: Tuple[str, ...] = ()) -> KeywordMatcher:
+    """Cached compile; callers pass tuples so the same lists reuse one matcher."""
+    return KeywordMatcher(keywords, exclude_terms, risk_terms)
@@ -3,15 +3,15 @@ import os, sys, csv, json, sqlite3, argparse, datetime, configparser, re
 from pathlib import Path
 from typing import Dict, Any, List
 import re
-import string
-from collections import defaultdict
-from write_runlog import write_runlog
 from urllib.parse import urlencode, quote_plus
 
-from scoring import fit_score as compute_fit, risk_score as compute_risk
-from sam_client import request_sam
-from change_detect import compute_rev_hash, upsert_opportunity
-from fetch_summaries import fetch_summary_text
+# Run from the repo root: python -m src.old.cts_opps_pipeline
+from src.old.write_runlog import write_runlog
+from src.old.scoring import fit_score as compute_fit, risk_score as compute_risk
+from src.old.sam_client import request_sam
+from src.old.change_detect import compute_rev_hash, upsert_opportunity
+from src.old.fetch_summaries import fetch_summary_text
+from src import portfolio_matcher
 
 DATE_FMT_OUT = "%Y-%m-%d"
 
@@ -123,43 +123,13 @@ def _sam_params(args: argparse.Namespace) -> Dict[str, Any]:
     return {"api_key": args.sam_api_key, "q": args.query, "from": pf, "to": pt, "limit": args.limit}
 
 # --- keyword/portfolio matching ---
-SHORT_KEYWORD_ALLOWLIST = {"ai", "it", "ml", "ehr"}
-
-def _normalize_text(txt: str) -> str:
-    if not txt:
-        return ""
-    # lowercase, replace punctuation with spaces
-    table = str.maketrans(string.punctuation, " " * len(string.punctuation))
-    return re.sub(r"\s+", " ", txt.translate(table).lower()).strip()
-
-def _expand_keyword(kw: str):
-    """
-    Expand tricky keywords like 'AI/ML' -> ['ai', 'ml', 'ai ml']
-    and 'zero-trust' -> ['zero trust'].
-    """
-    parts = re.split(r"[/\-]", kw.lower())
-    expanded = [kw.lower()]
-    if len(parts) > 1:
-        expanded.extend(parts)
-        expanded.append(" ".join(parts))
-    return expanded
+# Compiled once per portfolio config (see src/portfolio_matcher.py): one scan per lead
+SHORT_KEYWORD_ALLOWLIST = portfolio_matcher.SHORT_KEYWORD_ALLOWLIST
+_normalize_text = portfolio_matcher.normalize_text
+_expand_keyword = portfolio_matcher.expand_keyword
 
 def _match_portfolios_and_hits(text: str, portfolios: dict):
-    norm_text = _normalize_text(text)
-    pmatches = set()
-    actual_hits = defaultdict(list)
-    universe = []
-
-    for pname, keywords in portfolios.items():
-        for kw in keywords:
-            for variant in _expand_keyword(kw):
-                pattern = r"\b" + re.escape(variant) + r"s?\b"
-                if re.search(pattern, norm_text):
-                    pmatches.add(pname)
-                    actual_hits[pname].append(kw)
-                    universe.append(kw)
-                    break
-    return pmatches, universe, actual_hits
+    return portfolio_matcher.compile_portfolios(portfolios).match(text)
 
 def _export_artifacts(leads, export_dir: Path, base_name: str, want_csv: bool, want_ndjson: bool, overwrite: bool):
     export_dir.mkdir(parents=True, exist_ok=True)
@@ -200,7 +170,7 @@ def build_sam_params(args):
 
 BASE_URL = "https://api.sam.gov/opportunities/v2/search"
 
-import urllib.parse import urlencode
+from urllib.parse import urlencode
 
 def build_sam_url(params: dict) -> str:
     """
@@ -1,45 +1,27 @@
-import re
-import requests
-from pathlib import Path
-from io import BytesIO
+# Uses the src.* helpers: import as src.old.fetch_summaries / run with python -m from the repo root
+from src import blobstore, extractors, http_cache, text_cache
+from src.extractors import strip_html_tags  # noqa: F401  (kept importable from here)
 
-# PDF + DOCX support
-from PyPDF2 import PdfReader
-from docx import Document
 
-
-def strip_html_tags(raw_html: str) -> str:
-    """
-    Remove HTML tags and collapse whitespace.
-    """
-    text = re.sub(r"<[^>]+>", " ", raw_html)  # drop tags
-    text = re.sub(r"\s+", " ", text)          # collapse spaces
-    return text.strip()
-
-
-def extract_pdf(content: bytes) -> str:
-    """
-    Extract text from PDF bytes.
-    """
-    try:
-        reader = PdfReader(BytesIO(content))
-        texts = []
-        for page in reader.pages:
-            texts.append(page.extract_text() or "")
-        return " ".join(texts)
-    except Exception as e:
-        return f"[ERROR parsing PDF: {e}]"
-
-
-def extract_docx(content: bytes) -> str:
+def extract_text(entry: dict) -> str:
     """
-    Extract text from DOCX bytes.
+    Extract text from a cached body; the type is sniffed from its bytes, not the
+    Content-Type header (cached by content hash + extractor version).
     """
+    version = extractors.version()
+    cached = text_cache.get_text(entry["sha256"], "fetch_summaries", version)
+    if cached is not None:
+        return cached
+    path = blobstore.blob_path(entry["sha256"])
+    kind = extractors.sniff(path, entry["content_type"] or "")
+    if kind is None:
+        return f"[UNSUPPORTED content type: {entry['content_type']}]"
     try:
-        doc = Document(BytesIO(content))
-        return " ".join([p.text for p in doc.paragraphs])
+        text = extractors.extract(path, kind=kind) or ""
     except Exception as e:
-        return f"[ERROR parsing DOCX: {e}]"
+        return f"[ERROR parsing {kind.upper()}: {e}]"
+    text_cache.put_text(entry["sha256"], "fetch_summaries", version, text)
+    return text
 
 
 def fetch_summary_text(url: str, max_chars: int = 5000) -> str:
@@ -57,22 +39,20 @@ def fetch_summary_text(url: str, max_chars: int = 5000) -> str:
         return ""
 
     try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-
-        ctype = resp.headers.get("Content-Type", "").lower()
-
-        if "text/html" in ctype:
-            text = strip_html_tags(resp.text)
-        elif "text/plain" in ctype:
-            text = resp.text
-        elif "pdf" in ctype:
-            text = extract_pdf(resp.content)
-        elif "word" in ctype or "officedocument.wordprocessingml" in ctype:
-            text = extract_docx(resp.content)
-        else:
-            return f"[UNSUPPORTED content type: {ctype}]"
-
+        # Local HTTP cache: conditional request (ETag/Last-Modified), stale-while-revalidate if enabled
+        # Streamed with a byte ceiling: text bodies stop early, oversized binaries are skipped
+        entry = http_cache.fetch(
+            url,
+            max_age=http_cache.cache_cfg.get("description_max_age_hours", 24) * 3600,
+            stale_while_revalidate=http_cache.cache_cfg.get("stale_while_revalidate", False),
+            max_bytes=int(http_cache.cache_cfg.get("summary_max_mb", 20) * 1024 * 1024),
+            text_max_bytes=int(http_cache.cache_cfg.get("summary_text_max_kb", 256) * 1024),
+            head_precheck=True,
+        )
+        if entry is None:
+            return f"[ERROR fetching {url}: no response]"
+
+        text = extract_text(entry)
         return text[:max_chars]
 
     except Exception as e:
@@ -1,25 +1,205 @@
-import requests
-from PyPDF2 import PdfReader
-from io import BytesIO
-from typing import Optional
+import os
+import time
+import signal
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+import tomllib
+from src import blobstore, extractors, http_cache, text_cache
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+attach_cfg = config.get("attachments", {})
+
+_parse_pool = None
+_started = None  # workers report (blob path, pid, start time) here when they pick up a document
+_worker_started = None  # the same queue, inside a worker
+
+def _init_worker(started) -> None:
+    global _worker_started
+    _worker_started = started
+
+def _get_parse_pool(workers: int) -> ProcessPoolExecutor:
+    """Long-lived process pool for CPU-bound extraction (re-created after a timeout kill)."""
+    global _parse_pool, _started
+    if _parse_pool is None:
+        _started = multiprocessing.get_context().SimpleQueue()
+        _parse_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_started,))
+    return _parse_pool
+
+def _drop_parse_pool(pool: ProcessPoolExecutor) -> None:
+    """Forget a pool broken by a dying worker (OOM, segfault): it refuses all further work.
+    Only if it is still the current one - a fresh pool may already have replaced it."""
+    global _parse_pool
+    if _parse_pool is pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+def _kill_parse_pool(pids: List[int]) -> None:
+    """Terminate the workers stuck past parse_timeout (by the pids they reported) and drop
+    the pool, which is broken once they die; the next call gets a fresh one."""
+    global _parse_pool
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass  # Finished after all
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+    _parse_pool = None
+
+def download_attachment(url: str, timeout: float = None) -> Optional[str]:
+    """Network stage: return the sha256 of the attachment in the blob store. Goes through the
+    HTTP cache, so a known URL costs at most a conditional request (none while fresh)."""
+    timeout = timeout or attach_cfg.get("download_timeout", 10)
+    entry = http_cache.fetch(
+        url,
+        max_age=http_cache.cache_cfg.get("attachment_max_age_hours", 168) * 3600,
+        timeout=timeout,
+        max_bytes=int(attach_cfg.get("max_download_mb", 50) * 1024 * 1024),  # bigger files are skipped
+        head_precheck=attach_cfg.get("head_precheck", True),
+    )
+    return entry["sha256"] if entry else None
+
+EXTRACTOR = "registry"  # text cache key; type sniffed from magic bytes, see src/extractors.py
+
+def extract_blob(path: str) -> Tuple[Optional[str], Optional[str], Dict]:
+    """Process-pool entry point: the worker reads the blob from disk (no pickled bytes).
+    Returns (text, error, timings); the parent merges the timings into its own counters."""
+    if _worker_started is not None:
+        _worker_started.put((path, os.getpid(), time.time()))  # parse_timeout counts from here
+    try:
+        text, error = extractors.extract(path), None
+    except Exception as e:
+        text, error = None, str(e)
+    return text, error, extractors.drain_timings()
 
 def parse_attachment(url: str) -> Optional[str]:
-    """Download & extract text from PDF attachment URL (e.g., from SAM API)."""
+    """Download & extract text from an attachment URL (PDF, DOCX, XLSX, HTML, ZIP...; e.g., from SAM API)."""
     if not url:
         return None
+    sha256 = download_attachment(url)  # [attachments] download_timeout
+    if not sha256:
+        return None
+    cached = text_cache.get_text(sha256, EXTRACTOR, extractors.version())
+    if cached is not None:
+        return cached or None
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        reader = PdfReader(BytesIO(resp.content))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip() if text.strip() else None
+        text = extractors.extract(blobstore.blob_path(sha256))
     except Exception as e:
-        print(f"PDF parse error for {url}: {e}")
+        print(f"Attachment parse error for {url}: {e}")
         return None
+    text_cache.put_text(sha256, EXTRACTOR, extractors.version(), text)
+    return text
+
+def parse_attachments(urls: List[str], download_workers: int = None, parse_workers: int = None,
+                      download_timeout: float = None, parse_timeout: float = None) -> Dict[str, Optional[str]]:
+    """Batch download (thread pool) + extract (process pool), each with its own limit and timeout.
+
+    Returns {url: text or None}. Extraction of a document starts as soon as its download finishes.
+    """
+    download_workers = download_workers or attach_cfg.get("download_workers", 8)
+    parse_workers = parse_workers or attach_cfg.get("parse_workers", os.cpu_count() or 2)
+    parse_timeout = parse_timeout or attach_cfg.get("parse_timeout", 60)
+    urls = list(dict.fromkeys(u for u in urls if u))  # dedupe, keep order
+    results: Dict[str, Optional[str]] = {url: None for url in urls}
+    if not urls:
+        return results
+
+    version = extractors.version()
+    url_hashes = {}  # url -> sha256; identical documents share one parse
+    texts: Dict[str, Optional[str]] = {}  # sha256 -> text, from cache or fresh parse
+    queued: List[str] = []  # sha256s waiting for a free worker
+    running = {}  # future -> sha256; at most parse_workers, so each is actually being parsed
+    started = {}  # blob path -> (pid, start time) reported by the worker
+    submitted = {}  # future -> submit time; older start reports are left over from earlier calls
+    pools = {}  # future -> the pool it runs on
+    hung = {}  # future -> pid, past parse_timeout; killed once the healthy parses are done
+    retried = set()  # sha256s resubmitted after a worker died under them
+
+    def collect(fut) -> None:
+        sha256 = running.pop(fut)
+        submitted.pop(fut, None)
+        pool = pools.pop(fut)
+        try:
+            text, error, timings = fut.result()
+        except BrokenProcessPool as e:
+            # Every parse in flight fails with the dead worker; retry each once on a fresh pool
+            # (the document that killed it fails again and is then given up)
+            _drop_parse_pool(pool)
+            if sha256 not in retried:
+                retried.add(sha256)
+                queued.append(sha256)
+            else:
+                print(f"Attachment parse error for blob {sha256}: {e}")
+            return
+        except Exception as e:
+            print(f"Attachment parse error for blob {sha256}: {e}")
+            return
+        extractors.merge_timings(timings)
+        if error:
+            print(f"Attachment parse error for blob {sha256}: {error}")
+            return
+        texts[sha256] = text
+        text_cache.put_text(sha256, EXTRACTOR, version, text)
+
+    with ThreadPoolExecutor(max_workers=download_workers) as downloader:
+        downloads = {downloader.submit(download_attachment, url, download_timeout): url for url in urls}
+        while downloads or queued or running:
+            done, _ = wait(list(downloads) + [f for f in running if f not in hung], timeout=1.0, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in downloads:
+                    url, sha256 = downloads.pop(fut), fut.result()
+                    if not sha256:
+                        continue
+                    url_hashes[url] = sha256
+                    if sha256 in texts or sha256 in queued or sha256 in running.values():
+                        continue
+                    cached = text_cache.get_text(sha256, EXTRACTOR, version)
+                    if cached is not None:
+                        texts[sha256] = cached or None
+                    else:
+                        queued.append(sha256)
+                else:
+                    collect(fut)
+            while _started is not None and not _started.empty():
+                path, pid, start = _started.get()
+                started[path] = (pid, start)
+            for fut in [f for f in hung if f.done()]:  # finished just past the deadline after all
+                hung.pop(fut)
+                collect(fut)
+            now = time.time()
+            for fut, sha256 in running.items():
+                pid, start = started.get(blobstore.blob_path(sha256), (None, None))
+                if start is not None and start >= submitted[fut] and fut not in hung and not fut.done() and now - start > parse_timeout:
+                    print(f"Attachment parse timeout ({parse_timeout}s) for blob {sha256}")
+                    hung[fut] = pid
+            if hung and len(hung) == len(running):  # healthy parses finished: now kill the stuck ones
+                _kill_parse_pool(list(hung.values()))
+                for fut in hung:
+                    running.pop(fut)
+                    pools.pop(fut)
+                hung.clear()
+            while queued and not hung and len(running) < parse_workers:  # no new work for a pool about to die
+                sha256 = queued.pop(0)
+                submit_time = time.time()
+                pool = _get_parse_pool(parse_workers)
+                try:
+                    fut = pool.submit(extract_blob, blobstore.blob_path(sha256))
+                except BrokenProcessPool:  # a worker died since the last parse (this or an earlier call)
+                    _drop_parse_pool(pool)
+                    pool = _get_parse_pool(parse_workers)
+                    fut = pool.submit(extract_blob, blobstore.blob_path(sha256))
+                running[fut], submitted[fut], pools[fut] = sha256, submit_time, pool
+    for url, sha256 in url_hashes.items():
+        results[url] = texts.get(sha256)
+    return results
 
 # Test stub (mock URL would need real fetch)
 if __name__ == "__main__":
     # print(parse_attachment("https://example.gov/sample.pdf"))  # Uncomment with real URL
-    pass
\ No newline at end of file
+    pass
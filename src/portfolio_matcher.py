@@ -0,0 +1,107 @@
+import re
+import string
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple
+
+# Compiled portfolio matcher: every portfolio keyword and its variants (slash/hyphen splits,
+# optional plural "s") go into one token trie, so a lead is scanned once no matter how many
+# portfolios and keywords are configured. Same rules as the old per-variant
+# re.search(r"\b<variant>s?\b") loop in src/old/cts_opps_pipeline.py.
+
+SHORT_KEYWORD_ALLOWLIST = {"ai", "it", "ml", "ehr"}  # kept from the old module; expansion does not filter on it
+
+_PUNCT_TABLE = str.maketrans(string.punctuation, " " * len(string.punctuation))
+TOKEN_RE = re.compile(r"\w+")
+PLAIN_VARIANT_RE = re.compile(r"\w+(?: \w+)*")
+
+def normalize_text(txt: str) -> str:
+    """Lowercase, punctuation to spaces, whitespace collapsed."""
+    if not txt:
+        return ""
+    return re.sub(r"\s+", " ", txt.translate(_PUNCT_TABLE).lower()).strip()
+
+def expand_keyword(kw: str) -> List[str]:
+    """
+    Expand tricky keywords like 'AI/ML' -> ['ai/ml', 'ai', 'ml', 'ai ml']
+    and 'zero-trust' -> ['zero-trust', 'zero', 'trust', 'zero trust'].
+    """
+    parts = re.split(r"[/\-]", kw.lower())
+    expanded = [kw.lower()]
+    if len(parts) > 1:
+        expanded.extend(parts)
+        expanded.append(" ".join(parts))
+    return expanded
+
+class _Node:
+    __slots__ = ("children", "ends")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.ends: List[int] = []  # keyword ids whose variant ends here
+
+
+class PortfolioMatcher:
+    def __init__(self, portfolios: Dict[str, List[str]]):
+        self.keywords: List[Tuple[str, str]] = []  # id -> (portfolio, keyword), config order
+        self.root = _Node()
+        self.fallback: List[Tuple[int, re.Pattern]] = []  # variants that are not plain words
+        for pname, keywords in portfolios.items():
+            for kw in keywords:
+                kid = len(self.keywords)
+                self.keywords.append((pname, kw))
+                for variant in dict.fromkeys(expand_keyword(kw)):
+                    if PLAIN_VARIANT_RE.fullmatch(variant):
+                        node = self.root
+                        for token in variant.split(" "):
+                            node = node.children.setdefault(token, _Node())
+                        node.ends.append(kid)
+                    else:
+                        self.fallback.append((kid, re.compile(r"\b" + re.escape(variant) + r"s?\b")))
+
+    def match_ids(self, norm_text: str) -> Set[int]:
+        """Ids of keywords with at least one variant in already-normalized text."""
+        matched = set()
+        spans = [(m.group(), m.start(), m.end()) for m in TOKEN_RE.finditer(norm_text)]
+        children = self.root.children
+        for i, (token, _, _) in enumerate(spans):
+            if token not in children and not (token.endswith("s") and token[:-1] in children):
+                continue
+            node, j = self.root, i
+            while j < len(spans):
+                token = spans[j][0]
+                if token.endswith("s") and token[:-1] in node.children:  # plural: only on the last word
+                    matched.update(node.children[token[:-1]].ends)
+                node = node.children.get(token)
+                if node is None:
+                    break
+                matched.update(node.ends)
+                # Multi-word variants need the words separated by exactly one space
+                if j + 1 >= len(spans) or norm_text[spans[j][2]:spans[j + 1][1]] != " ":
+                    break
+                j += 1
+        for kid, pattern in self.fallback:
+            if kid not in matched and pattern.search(norm_text):
+                matched.add(kid)
+        return matched
+
+    def match(self, text: str):
+        """Returns (matched portfolio names, keywords hit, {portfolio: [keywords hit]})."""
+        pmatches = set()
+        actual_hits = defaultdict(list)
+        universe = []
+        for kid in sorted(self.match_ids(normalize_text(text))):
+            pname, kw = self.keywords[kid]
+            pmatches.add(pname)
+            actual_hits[pname].append(kw)
+            universe.append(kw)
+        return pmatches, universe, actual_hits
+
+
+@lru_cache(maxsize=8)
+def _compiled(key: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> PortfolioMatcher:
+    return PortfolioMatcher({pname: list(kws) for pname, kws in key})
+
+def compile_portfolios(portfolios: Dict[str, List[str]]) -> PortfolioMatcher:
+    """Compiled matcher for a portfolios dict, reused while its contents are unchanged."""
+    return _compiled(tuple((pname, tuple(kws)) for pname, kws in portfolios.items()))
@@ -0,0 +1,119 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+# Shared SAM.gov quota scheduler: one token bucket + daily quota per API key, requests
+# rotate to whichever key can go soonest. Only the calling thread waits; other keys stay usable.
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/sec, holds at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if available now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+class KeyState:
+    def __init__(self, key: str, rate: float, burst: float, daily_quota: int):
+        self.key = key
+        self.bucket = TokenBucket(rate, burst)
+        self.daily_quota = daily_quota
+        self.used_today = 0
+        self.day = _utc_day()
+        self.server_remaining: Optional[int] = None  # from X-RateLimit-Remaining
+        self.blocked_until = 0.0  # monotonic; set from Retry-After
+
+    def remaining(self) -> int:
+        if self.day != _utc_day():  # SAM quotas reset daily
+            self.day, self.used_today, self.server_remaining = _utc_day(), 0, None
+        left = self.daily_quota - self.used_today
+        if self.server_remaining is not None:
+            left = min(left, self.server_remaining)
+        return left
+
+
+def _utc_day() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class QuotaExhausted(Exception):
+    """Every key has used its daily quota."""
+
+
+class KeyScheduler:
+    """Thread-safe rotation over several API keys, each with its own bucket and daily quota."""
+
+    def __init__(self, keys: List[str], rate_per_sec: float = 1.0, burst: float = 1.0, daily_quota: int = 1000):
+        if not keys:
+            raise ValueError("KeyScheduler needs at least one API key")
+        self.keys: Dict[str, KeyState] = {k: KeyState(k, rate_per_sec, burst, daily_quota) for k in keys}
+        self.lock = threading.Lock()
+
+    def acquire(self) -> str:
+        """Block until some key may send a request; returns that key."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                best, best_wait = None, None
+                for state in self.keys.values():
+                    if state.remaining() <= 0:
+                        continue
+                    wait = max(state.bucket.wait_time(now), state.blocked_until - now)
+                    # Prefer the soonest key; tie-break on most quota left so load spreads evenly
+                    if best is None or (wait, -state.remaining()) < (best_wait, -best.remaining()):
+                        best, best_wait = state, wait
+                if best is None:
+                    raise QuotaExhausted(f"All {len(self.keys)} SAM API keys are out of daily quota")
+                if best_wait <= 0:
+                    best.bucket.take(now)
+                    best.used_today += 1
+                    return best.key
+            time.sleep(min(best_wait, 5.0))
+
+    def report(self, key: str, status_code: int, headers: Dict) -> None:
+        """Feed back response headers: Retry-After blocks the key, X-RateLimit-Remaining syncs quota."""
+        with self.lock:
+            state = self.keys[key]
+            remaining = headers.get("X-RateLimit-Remaining")
+            if remaining is not None:
+                try:
+                    state.server_remaining = int(remaining)
+                except ValueError:
+                    pass
+            if status_code == 429:
+                delay = _retry_after_seconds(headers.get("Retry-After"))
+                if delay is None:
+                    delay = random.uniform(1.0, 30.0)  # no hint: jittered so keys don't retry in lockstep
+                state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
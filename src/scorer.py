@@ -1,8 +1,9 @@
 import os
-import re
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import tomllib
+from src import semantic
+from src.keyword_matcher import MatchResult, build_matcher
 
 # Load config with robust path (works for direct run or import)
 config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
@@ -21,34 +22,59 @@ for section in config:
     for key, value in config[section].items():
         config[section][key] = interpolate_env(value)
 
+RISK_FACTORS = ['incumbent', 'current contractor', 'sole source']  # Default when [filters] risk_terms is unset
+
+def get_matcher(keywords: list = None):
+    """Compiled matcher for keywords (default [filters] keywords) plus the exclude/risk lists."""
+    filters = config['filters']
+    return build_matcher(
+        tuple(filters['keywords'] if keywords is None else keywords),
+        tuple(filters.get('exclude_keywords', [])),
+        tuple(filters.get('risk_terms', RISK_FACTORS)),
+    )
+
+def lead_text(lead: Dict) -> str:
+    return (lead.get('description') or '') + ' ' + (lead.get('parsed_doc_text') or '')
+
+def scan_lead(lead: Dict, keywords: list = None) -> MatchResult:
+    """One scan of description + attachment text; pass the result to fit/risk/triage below."""
+    return get_matcher(keywords).scan(lead_text(lead))
+
 def strict_keyword_match(text: str, keywords: list) -> int:
     """Count exact keyword matches in text (case-insensitive)."""
-    text_lower = text.lower()
-    matches = sum(1 for kw in keywords if re.search(rf'\b{kw.lower()}\b', text_lower))
-    return matches
+    return len(get_matcher(keywords).scan(text).keyword_hits)
 
-def fit_score(text: str, keywords: list) -> float:
+def fit_score(text: str, keywords: list, match: MatchResult = None) -> float:
     """Normalized fit score (0.0-1.0) based on keyword density and matches."""
     if not text:
         return 0.0
-    match_count = strict_keyword_match(text, keywords)
-    text_words = len(re.findall(r'\w+', text.lower()))
+    match = match or get_matcher(keywords).scan(text)
+    match_count = len(match.keyword_hits)
+    text_words = match.word_count
     density = match_count / max(len(keywords), 1)  # Normalize by keywords
     if text_words > 0:
         density = min(density + (match_count / text_words), 1.0)  # Boost for density
     return density
 
-def ai_enhanced_score(text: str, keywords: list) -> float:
-    """Stub for AI scoring (e.g., via OpenAI embeddings similarity). Returns 0.0-1.0 fit."""
-    # TODO: Integrate real AI; for now, enhance fit_score
-    base_fit = fit_score(text, keywords)
-    return min(base_fit * 1.2, 1.0)  # Slight boost for demo
+def ai_enhanced_scores(texts: List[str], keywords: list, matches: List[MatchResult] = None) -> List[float]:
+    """Batch AI fit (0.0-1.0): keyword fit blended with embedding similarity to the profiles
+    (src/semantic.py). Without a semantic model, falls back to a boosted fit_score."""
+    matches = matches or [None] * len(texts)
+    fits = [fit_score(text, keywords, match) for text, match in zip(texts, matches)]
+    semantic_fit = semantic.semantic_scores(texts, keywords)
+    if semantic_fit is None:
+        return [min(fit * 1.2, 1.0) for fit in fits]  # Keyword-only boost
+    weight = semantic.sem_cfg.get("weight", 0.5)
+    return [min((1 - weight) * fit + weight * float(sem), 1.0) for fit, sem in zip(fits, semantic_fit)]
+
+def ai_enhanced_score(text: str, keywords: list, match: MatchResult = None) -> float:
+    """AI fit for one text; prefer ai_enhanced_scores for many (one model batch)."""
+    return ai_enhanced_scores([text], keywords, [match])[0]
 
-def risk_score(lead: Dict) -> float:
+def risk_score(lead: Dict, match: MatchResult = None) -> float:
     """Heuristic risk: 0.0 (low) to 1.0 (high). E.g., incumbent mentions, short deadline."""
-    text = (lead.get('description', '') + ' ' + lead.get('parsed_doc_text', '')).lower()
-    risk_factors = ['incumbent', 'current contractor', 'sole source']  # From config if expanded
-    risk_hits = sum(1 for factor in risk_factors if factor in text)
+    match = match or scan_lead(lead)
+    risk_hits = len(match.risk_hits)
     days_to_due = compute_days_to_due(lead)
     deadline_risk = 1.0 if days_to_due and days_to_due < 30 else 0.5 if days_to_due and days_to_due < 60 else 0.0
     return min((risk_hits * 0.2) + deadline_risk, 1.0)
@@ -68,18 +94,19 @@ def compute_days_to_due(lead: Dict) -> Optional[int]:
         except ValueError:
             return None
 
-def should_triage(lead: Dict) -> bool:
+def should_triage(lead: Dict, match: MatchResult = None) -> bool:
     """Triage if overall score >= threshold and within filters (e.g., value, days)."""
-    text = lead.get('description', '') + ' ' + lead.get('parsed_doc_text', '')
-    fit = fit_score(text, config['filters']['keywords'])  # Use new fit_score
-    risk = risk_score(lead)
+    text = lead_text(lead)
+    match = match or scan_lead(lead)  # One scan: fit, risk and excludes share it
+    fit = fit_score(text, config['filters']['keywords'], match)  # Use new fit_score
+    risk = risk_score(lead, match)
     overall = (fit * config['scoring']['fit_weight']) + ((1 - risk) * config['scoring']['risk_weight'])
 
     days_to_due = compute_days_to_due(lead)
     value = lead.get('estimatedValue', 0)  # Assume from lead dict; fetch if needed
     within_days = days_to_due is None or (days_to_due <= config['filters']['max_days_to_due'] and days_to_due > 0)
     within_value = value >= config['filters']['min_value']
-    no_excludes = not any(ex in text.lower() for ex in config['filters']['exclude_keywords'])
+    no_excludes = not match.exclude_hits
 
     return overall >= config['scoring']['threshold'] and within_days and within_value and no_excludes
 
@@ -0,0 +1,208 @@
+import os
+import time
+import hashlib
+import threading
+import importlib.util
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import tomllib
+from src import chunker, embedding_store
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+sem_cfg = config.get("semantic", {})
+
+# Semantic fit: leads are embedded in batches with a sentence-transformers model (CPU by
+# default) and compared with profile centroids built from [filters] keywords and each
+# [portfolios] entry. A lead's score is its best cosine similarity, rescaled to 0-1 between
+# sim_floor and sim_ceiling. Without sentence-transformers (or with enabled = false) the
+# functions return None and scorer falls back to the keyword-only score.
+profile_cache_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'semantic_profiles.npz')
+
+_model = None  # False once loading failed: don't retry every batch
+_model_lock = threading.Lock()
+_profiles: Optional[Tuple[List[str], np.ndarray]] = None
+
+# CPU inference mode: pinned torch threads, optional int8 dynamic quantization of the Linear
+# layers and a batch size auto-tuned on the first real batch. stats feeds inference_report():
+# cold-start load time and sentences/sec.
+stats = {"load_seconds": None, "sentences": 0, "encode_seconds": 0.0, "batch_size": None}
+AUTOTUNE_SIZES = (8, 16, 32, 64, 128)
+
+def available() -> bool:
+    return sem_cfg.get("enabled", True) and importlib.util.find_spec("sentence_transformers") is not None
+
+def _pin_threads() -> None:
+    threads = sem_cfg.get("torch_threads", 0)
+    if threads:
+        os.environ.setdefault("OMP_NUM_THREADS", str(threads))  # before torch import: covers MKL/OpenMP pools
+        os.environ.setdefault("MKL_NUM_THREADS", str(threads))
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    interop = sem_cfg.get("interop_threads", 0)
+    if interop:
+        try:
+            torch.set_num_interop_threads(interop)
+        except RuntimeError:
+            pass  # Only settable before the first parallel op; keep torch's choice
+
+def get_model():
+    """Process-wide SentenceTransformer, loaded on first use; None if unavailable."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            if not available():
+                _model = False
+            else:
+                try:
+                    start = time.perf_counter()
+                    _pin_threads()
+                    from sentence_transformers import SentenceTransformer
+                    _model = SentenceTransformer(sem_cfg.get("model", "sentence-transformers/all-MiniLM-L6-v2"),
+                                                 device=sem_cfg.get("device", "cpu"))
+                    _model.max_seq_length = sem_cfg.get("max_seq_length", 256)
+                    if sem_cfg.get("quantize") == "int8":
+                        import torch
+                        _model = torch.ao.quantization.quantize_dynamic(_model, {torch.nn.Linear}, dtype=torch.qint8)
+                    stats["load_seconds"] = time.perf_counter() - start
+                except Exception as e:
+                    print(f"Semantic model unavailable ({e}); using keyword scores only")
+                    _model = False
+        return _model or None
+
+def profiles() -> Dict[str, List[str]]:
+    """Profile name -> phrases: the filter keywords plus each portfolio."""
+    result = {"keywords": list(config.get("filters", {}).get("keywords", []))}
+    for name, phrases in config.get("portfolios", {}).items():
+        result[name] = list(phrases)
+    return {name: phrases for name, phrases in result.items() if phrases}
+
+def _truncate(text: str) -> str:
+    # The model only sees max_seq_length tokens; don't tokenize whole attachments to find that out
+    return (text or "")[:sem_cfg.get("max_seq_length", 256) * 8]
+
+def model_id() -> str:
+    """Identifies what produced a vector: model name plus settings that change the output."""
+    model_id = f"{sem_cfg.get('model', 'sentence-transformers/all-MiniLM-L6-v2')}|seq={sem_cfg.get('max_seq_length', 256)}"
+    return model_id + ("|int8" if sem_cfg.get("quantize") == "int8" else "")
+
+def _encode_batches(model, texts: List[str], batch_size: int) -> np.ndarray:
+    """Encode texts (model.encode sorts each call by length, so batches pad little)."""
+    start = time.perf_counter()
+    out = model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                       normalize_embeddings=True, show_progress_bar=False)
+    stats["sentences"] += len(texts)
+    stats["encode_seconds"] += time.perf_counter() - start
+    return np.asarray(out, dtype=np.float32)
+
+def _autotune(model, texts: List[str]) -> int:
+    """Pick the batch size with the best sentences/sec on a sample of this workload."""
+    sample = sorted(texts, key=len)[::max(len(texts) // 128, 1)][:128]  # spread over short..long texts
+    best, best_rate = AUTOTUNE_SIZES[0], 0.0
+    for size in AUTOTUNE_SIZES:
+        if size > len(sample):
+            break
+        start = time.perf_counter()
+        model.encode(sample, batch_size=size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)
+        rate = len(sample) / max(time.perf_counter() - start, 1e-9)
+        if rate > best_rate:
+            best, best_rate = size, rate
+    print(f"Semantic batch size auto-tuned to {best} ({best_rate:.0f} sentences/s on {len(sample)} samples)")
+    return best
+
+def _batch_size(model, texts: List[str]) -> int:
+    if stats["batch_size"] is None:
+        configured = sem_cfg.get("batch_size", 64)
+        # "auto" needs a real batch to measure; tiny calls use the default until one arrives
+        if configured != "auto":
+            stats["batch_size"] = configured
+        elif len(texts) >= 2 * AUTOTUNE_SIZES[-1]:
+            stats["batch_size"] = _autotune(model, texts)
+        else:
+            return 32
+    return stats["batch_size"]
+
+def inference_report() -> str:
+    rate = stats["sentences"] / stats["encode_seconds"] if stats["encode_seconds"] else 0.0
+    load = f"{stats['load_seconds']:.1f}s" if stats["load_seconds"] is not None else "not loaded"
+    return (f"Semantic model ({model_id()}): load {load}, {stats['sentences']} sentences in "
+            f"{stats['encode_seconds']:.1f}s ({rate:.1f}/s), batch size {stats['batch_size']}")
+
+def embed(texts: Sequence[str]) -> Optional[np.ndarray]:
+    """L2-normalized embeddings (len(texts) x dim), batched; None without a model.
+    Goes through the embedding store, so only new or changed text reaches the model."""
+    model = get_model()
+    if model is None:
+        return None
+
+    def encode(batch: List[str]) -> np.ndarray:
+        return _encode_batches(model, batch, _batch_size(model, batch))
+    texts = [embedding_store.normalize(_truncate(t)) for t in texts]
+    if not sem_cfg.get("embedding_cache", True):
+        return encode(texts)
+    return embedding_store.embed_cached(texts, encode, model_id())
+
+def profile_embeddings() -> Optional[Tuple[List[str], np.ndarray]]:
+    """(profile names, normalized centroid per profile); computed once, cached on disk by content."""
+    global _profiles
+    if _profiles is not None:
+        return _profiles
+    if get_model() is None:
+        return None
+    prof = profiles()
+    key = hashlib.sha256(repr((model_id(), sorted(prof.items()))).encode()).hexdigest()  # same vectors as the leads
+    try:
+        cached = np.load(profile_cache_path)
+        if str(cached["key"]) == key:
+            _profiles = ([str(n) for n in cached["names"]], cached["centroids"])
+            return _profiles
+    except (OSError, KeyError, ValueError):
+        pass  # Missing or stale cache: rebuild
+    names = list(prof)
+    centroids = []
+    for name in names:
+        vectors = embed(prof[name])
+        centroid = vectors.mean(axis=0)
+        centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+    _profiles = (names, np.vstack(centroids).astype(np.float32))
+    os.makedirs(os.path.dirname(profile_cache_path), exist_ok=True)
+    np.savez(profile_cache_path, key=key, names=np.array(names), centroids=_profiles[1])
+    return _profiles
+
+def similarities(texts: Sequence[str]) -> Optional[np.ndarray]:
+    """Cosine similarity of each text to each profile (len(texts) x profiles)."""
+    prof = profile_embeddings()
+    if prof is None or not len(texts):
+        return None
+    return embed(texts) @ prof[1].T
+
+def semantic_scores(texts: Sequence[str], keywords: Sequence[str] = None) -> Optional[np.ndarray]:
+    """0-1 semantic fit per text: best profile similarity rescaled between sim_floor and sim_ceiling.
+    Long texts are scored as budgeted chunks (src/chunker.py) in one batch, then pooled per text."""
+    if not chunker.chunk_cfg.get("enabled", True):
+        sims = similarities(texts)
+        best = None if sims is None else sims.max(axis=1)
+    else:
+        chunks = [chunker.lead_chunks(text, keywords) for text in texts]
+        sims = similarities([c for lead in chunks for c in lead])
+        best = None
+        if sims is not None:
+            per_chunk = sims.max(axis=1)
+            bounds = np.cumsum([0] + [len(lead) for lead in chunks])
+            best = np.array([chunker.pool(per_chunk[a:b]) for a, b in zip(bounds[:-1], bounds[1:])])
+    if best is None:
+        return None
+    floor, ceiling = sem_cfg.get("sim_floor", 0.15), sem_cfg.get("sim_ceiling", 0.6)
+    return np.clip((best - floor) / max(ceiling - floor, 1e-6), 0.0, 1.0)
+
+# Test stub
+if __name__ == "__main__":
+    samples = ["Cloud migration and software development services for agency systems",
+               "Janitorial services and grounds maintenance"]
+    print(f"Profiles: {list(profiles())}")
+    print(f"Semantic scores: {semantic_scores(samples)}")
+    print(inference_report())
@@ -29,10 +29,21 @@ def init_db() -> None:
             risk_score REAL DEFAULT 0.0,
             triaged BOOLEAN DEFAULT 0,
             triaged_at TEXT,
+            score_fingerprint TEXT,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             updated_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(leads)")}
+    if "score_fingerprint" not in columns:  # DBs created before incremental re-scoring
+        cursor.execute("ALTER TABLE leads ADD COLUMN score_fingerprint TEXT")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS watermarks (
+            source TEXT PRIMARY KEY,
+            last_posted TEXT,
+            updated_at TEXT
+        )
+    ''')
     conn.commit()
     conn.close()
     print(f"DB initialized at {db_path}")
@@ -47,8 +58,8 @@ def upsert_lead(lead: Dict) -> None:
             sam_id, title, description, naics, soc, point_of_contact,
             response_deadline, posted_date, link, parsed_doc_text,
             desc_url, attach_url, fit_score, risk_score, triaged, triaged_at,
-            updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            score_fingerprint, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     ''', (
         lead.get('sam_id'),
         lead.get('title'),
@@ -66,12 +77,35 @@ def upsert_lead(lead: Dict) -> None:
         lead.get('risk_score', 0.0),
         lead.get('triaged', False),
         lead.get('triaged_at'),
+        lead.get('score_fingerprint'),
         now
     ))
     conn.commit()
     conn.close()
     print(f"Upserted lead {lead.get('sam_id')}")
 
+LEAD_COLUMNS = ("sam_id", "title", "description", "naics", "soc", "point_of_contact", "response_deadline", "posted_date",
+                "link", "parsed_doc_text", "desc_url", "attach_url", "fit_score", "risk_score", "triaged", "triaged_at",
+                "score_fingerprint")
+
+def upsert_scored_leads(leads: List[Dict]) -> None:
+    """Upsert many scored leads in one transaction. Unlike upsert_lead, a stored triaged flag is
+    kept (as in bulk_update_scores, triaged is only ever set, not cleared)."""
+    if not leads:
+        return
+    conn = sqlite3.connect(db_path)
+    now = datetime.now().isoformat()
+    defaults = {"fit_score": 0.0, "risk_score": 0.0, "triaged": False}
+    updates = ", ".join(f"{col} = excluded.{col}" for col in LEAD_COLUMNS[1:] + ("updated_at",) if col not in ("triaged", "triaged_at"))
+    conn.executemany(f'''
+        INSERT INTO leads ({", ".join(LEAD_COLUMNS)}, updated_at) VALUES ({", ".join("?" * (len(LEAD_COLUMNS) + 1))})
+        ON CONFLICT(sam_id) DO UPDATE SET {updates},
+            triaged = MAX(leads.triaged, excluded.triaged), triaged_at = COALESCE(excluded.triaged_at, leads.triaged_at)
+    ''', [tuple(lead.get(col, defaults.get(col)) for col in LEAD_COLUMNS) + (now,) for lead in leads])
+    conn.commit()
+    conn.close()
+    print(f"Upserted {len(leads)} scored leads")
+
 def query_leads(since: Optional[str] = None, triaged_only: bool = False) -> List[Dict]:
     """Query leads; optional since date or triaged filter. Returns list of dicts."""
     conn = sqlite3.connect(db_path)
@@ -84,13 +118,90 @@ def query_leads(since: Optional[str] = None, triaged_only: bool = False) -> List
     if triaged_only:
         where_clauses.append("triaged = 1")
     where_sql = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-    cursor.execute(f"SELECT * FROM leads{where_sql} ORDER BY updated_at DESC")
+    cursor.execute(f"SELECT * FROM leads{where_sql} ORDER BY updated_at DESC", params)
     rows = cursor.fetchall()
     columns = [col[0] for col in cursor.description]
     leads = [dict(zip(columns, row)) for row in rows]
     conn.close()
     return leads
 
+def query_leads_by_ids(sam_ids: List[str]) -> List[Dict]:
+    """Leads with the given sam_ids, as dicts."""
+    conn = sqlite3.connect(db_path)
+    leads = []
+    for i in range(0, len(sam_ids), 500):  # SQLite variable limit
+        chunk = sam_ids[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        cursor = conn.execute(f"SELECT * FROM leads WHERE sam_id IN ({marks})", chunk)
+        columns = [col[0] for col in cursor.description]
+        leads.extend(dict(zip(columns, row)) for row in cursor.fetchall())
+    conn.close()
+    return leads
+
+def get_fingerprints(sam_ids: List[str]) -> Dict[str, str]:
+    """sam_id -> stored score_fingerprint, for the ids that have one."""
+    conn = sqlite3.connect(db_path)
+    found = {}
+    for i in range(0, len(sam_ids), 500):  # SQLite variable limit
+        chunk = sam_ids[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        found.update(conn.execute(f"SELECT sam_id, score_fingerprint FROM leads WHERE sam_id IN ({marks}) AND score_fingerprint IS NOT NULL", chunk))
+    conn.close()
+    return found
+
+def bulk_update_scores(updates: List[Dict]) -> None:
+    """Write re-computed fit/risk scores in one transaction; triaged is only ever set, not cleared."""
+    conn = sqlite3.connect(db_path)
+    now = datetime.now().isoformat()
+    conn.executemany('''
+        UPDATE leads SET fit_score = ?, risk_score = ?,
+            triaged = MAX(triaged, ?), triaged_at = COALESCE(?, triaged_at),
+            score_fingerprint = COALESCE(?, score_fingerprint), updated_at = ?
+        WHERE sam_id = ?
+    ''', [(u['fit_score'], u['risk_score'], u.get('triaged', False), u.get('triaged_at'), u.get('score_fingerprint'), now, u['sam_id']) for u in updates])
+    conn.commit()
+    conn.close()
+    print(f"Updated scores for {len(updates)} leads")
+
+def set_fingerprints(fingerprints: Dict[str, str]) -> None:
+    """Record sam_id -> score_fingerprint for leads whose stored scores are known current."""
+    conn = sqlite3.connect(db_path)
+    conn.executemany("UPDATE leads SET score_fingerprint = ? WHERE sam_id = ?", [(fp, sam_id) for sam_id, fp in fingerprints.items()])
+    conn.commit()
+    conn.close()
+
+def get_meta(key: str) -> Optional[str]:
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def set_meta(key: str, value: str) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+    conn.commit()
+    conn.close()
+
+def get_watermark(source: str) -> Optional[str]:
+    """Last successfully processed posted date (YYYY-MM-DD) for a source, if any."""
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT last_posted FROM watermarks WHERE source = ?", (source,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def set_watermark(source: str, last_posted: str) -> None:
+    """Advance (never rewind) the watermark for a source."""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        INSERT INTO watermarks (source, last_posted, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(source) DO UPDATE SET last_posted = MAX(last_posted, excluded.last_posted), updated_at = excluded.updated_at
+    ''', (source, last_posted, datetime.now().isoformat()))
+    conn.commit()
+    conn.close()
+    print(f"Watermark {source} -> {last_posted}")
+
 # Test stub
 if __name__ == "__main__":
     init_db()
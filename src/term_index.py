@@ -0,0 +1,229 @@
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Set
+from src.batch_scorer import score_batch
+from src.detector import compute_input_hashes, compute_score_fingerprints
+from src.portfolio_matcher import compile_portfolios, expand_keyword, normalize_text
+from src.scorer import config
+from src.storage import db_path, query_leads_by_ids, bulk_update_scores, set_fingerprints, get_meta, set_meta
+
+# Inverted index of terms -> sam_ids over title, description and parsed_doc_text, kept in
+# leads.db next to the leads. A keyword change can only move the scores of leads that contain
+# the changed keyword(s) - or, since fit is normalized by the keyword count, any keyword at
+# all when the count changes - so impact analysis scores just those candidates (old vs new
+# keywords) instead of re-scanning the whole history.
+
+TOKEN_RE = re.compile(r'\w+')
+FINGERPRINT_COLUMNS = ("title", "naics", "response_deadline", "posted_date", "desc_url", "attach_url")  # what detector hashes
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS term_postings (
+            term TEXT,
+            sam_id TEXT,
+            PRIMARY KEY (term, sam_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS term_postings_sam_id ON term_postings (sam_id)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS term_index_docs (
+            sam_id TEXT PRIMARY KEY,
+            text_hash TEXT
+        )
+    ''')
+    return conn
+
+def terms(text: str) -> Set[str]:
+    """Index terms: lowercase \\w+ tokens (what KeywordMatcher sees) plus the tokens of the
+    punctuation-normalized text (what PortfolioMatcher sees)."""
+    lower = (text or "").lower()
+    return set(TOKEN_RE.findall(lower)) | set(normalize_text(lower).split())
+
+def update_index(rebuild: bool = False) -> Dict[str, int]:
+    """Index new leads and re-index those whose text changed; drop deleted ones."""
+    start = time.perf_counter()
+    conn = _connect()
+    if rebuild:
+        conn.execute("DELETE FROM term_postings")
+        conn.execute("DELETE FROM term_index_docs")
+    known = dict(conn.execute("SELECT sam_id, text_hash FROM term_index_docs"))
+    indexed = 0
+    seen = set()
+    last = ""
+    while True:  # keyset pages: each read finishes before this connection writes
+        rows = conn.execute("SELECT sam_id, title, description, parsed_doc_text FROM leads WHERE sam_id > ? ORDER BY sam_id LIMIT 200",
+                            (last,)).fetchall()
+        if not rows:
+            break
+        last = rows[-1][0]
+        for sam_id, title, description, parsed in rows:
+            seen.add(sam_id)
+            text = " ".join((title or "", description or "", parsed or ""))
+            text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            if known.get(sam_id) == text_hash:
+                continue
+            conn.execute("DELETE FROM term_postings WHERE sam_id = ?", (sam_id,))
+            conn.executemany("INSERT INTO term_postings (term, sam_id) VALUES (?, ?)", [(t, sam_id) for t in terms(text)])
+            conn.execute("INSERT OR REPLACE INTO term_index_docs (sam_id, text_hash) VALUES (?, ?)", (sam_id, text_hash))
+            indexed += 1
+    gone = [(sam_id,) for sam_id in known if sam_id not in seen]
+    conn.executemany("DELETE FROM term_postings WHERE sam_id = ?", gone)
+    conn.executemany("DELETE FROM term_index_docs WHERE sam_id = ?", gone)
+    conn.commit()
+    conn.close()
+    if get_meta('scored_keywords') is None:  # first build: assume stored scores match the config
+        set_meta('scored_keywords', json.dumps(config['filters']['keywords']))
+    counts = {'leads': len(seen), 'indexed': indexed, 'removed': len(gone)}
+    print(f"Term index: {counts['indexed']} leads (re)indexed, {counts['removed']} removed, "
+          f"{counts['leads']} total in {time.perf_counter() - start:.1f}s")
+    return counts
+
+def _postings(conn: sqlite3.Connection, term: str) -> Set[str]:
+    return {row[0] for row in conn.execute("SELECT sam_id FROM term_postings WHERE term = ?", (term,))}
+
+def _phrase_candidates(conn: sqlite3.Connection, phrase: str, plural: bool = False) -> Set[str]:
+    """Leads containing every word of phrase (a superset of the leads matching it);
+    with plural, the last word may also appear with a trailing 's' (portfolio matching)."""
+    words = TOKEN_RE.findall(phrase.lower())
+    if not words:
+        return set()
+    result = None
+    for i, word in enumerate(words):
+        ids = _postings(conn, word)
+        if plural and i == len(words) - 1:
+            ids |= _postings(conn, word + "s")
+        result = ids if result is None else result & ids
+        if not result:
+            break
+    return result
+
+def candidates(keywords: Iterable[str]) -> Set[str]:
+    """sam_ids of leads that may match any of keywords."""
+    conn = _connect()
+    found = set()
+    for kw in keywords:
+        found |= _phrase_candidates(conn, kw)
+    conn.close()
+    return found
+
+def baseline_keywords() -> List[str]:
+    """Keywords the stored scores were computed with; recorded by the first index build, a
+    full batch_scorer.rescore, and impact(apply=True)."""
+    value = get_meta('scored_keywords')
+    return json.loads(value) if value else list(config['filters']['keywords'])
+
+def _refresh_fingerprints(old_keywords: List[str], skip: Set[str]) -> int:
+    """Leads a keyword change leaves unchanged keep their scores, but their fingerprints still
+    hash the old [filters]: re-stamp those that were current under old_keywords, so the next
+    rescore/pipeline run doesn't re-score the whole history. Leads stale for another reason
+    keep their old fingerprint and are re-scored as usual."""
+    conn = _connect()
+    rows = conn.execute(f"SELECT sam_id, score_fingerprint, {', '.join(FINGERPRINT_COLUMNS)} FROM leads WHERE score_fingerprint IS NOT NULL").fetchall()
+    conn.close()
+    rows = [row for row in rows if row[0] not in skip]
+    leads = [dict(zip(FINGERPRINT_COLUMNS, fields)) for _, _, *fields in rows]
+    input_hashes = compute_input_hashes(leads)  # one cache query, shared by old and new fingerprints
+    old_fps = compute_score_fingerprints(leads, old_keywords, input_hashes)
+    new_fps = compute_score_fingerprints(leads, input_hashes=input_hashes)
+    refreshed = {row[0]: new for row, old, new in zip(rows, old_fps, new_fps) if row[1] == old}
+    set_fingerprints(refreshed)
+    return len(refreshed)
+
+def impact(old_keywords: List[str], new_keywords: List[str], apply: bool = False) -> Dict:
+    """Score the leads a keyword change can affect with the old and the new keywords.
+
+    Returns counts plus the sam_ids gaining and losing triage. With apply, writes the new
+    scores, re-stamps the fingerprints of the leads whose scores don't move, and records
+    new_keywords as the baseline - only for new_keywords = the configured keywords, which the
+    written scores and fingerprints then agree with."""
+    start = time.perf_counter()
+    if apply and list(new_keywords) != list(config['filters']['keywords']):
+        print("Not applying: new keywords differ from [filters] keywords (edit the config, then apply)")
+        apply = False
+    old = {kw.lower() for kw in old_keywords}
+    new = {kw.lower() for kw in new_keywords}
+    changed = old ^ new
+    # fit divides by len(keywords): a different count moves every lead with any hit
+    ids = candidates(old | new if len(old_keywords) != len(new_keywords) else changed)
+    leads = query_leads_by_ids(sorted(ids))
+    result = {'candidates': len(leads), 'score_changed': 0, 'gained': [], 'lost': []}
+    written = set()
+    if leads:
+        before = score_batch(leads, old_keywords)
+        after = score_batch(leads, new_keywords)
+        moved = before['fit'] != after['fit']
+        result['score_changed'] = int(moved.sum())
+        result['gained'] = [lead['sam_id'] for lead, b, a in zip(leads, before['triage'], after['triage']) if a and not b]
+        result['lost'] = [lead['sam_id'] for lead, b, a in zip(leads, before['triage'], after['triage']) if b and not a]
+        if apply:
+            idx = moved.nonzero()[0]
+            fingerprints = compute_score_fingerprints([leads[i] for i in idx])
+            updates = [
+                {'sam_id': leads[i]['sam_id'], 'fit_score': float(after['fit'][i]), 'risk_score': float(after['risk'][i]),
+                 'score_fingerprint': fp}
+                for i, fp in zip(idx, fingerprints)]
+            bulk_update_scores(updates)
+            written = {u['sam_id'] for u in updates}
+    if apply:  # every other lead's score is the same under new_keywords
+        result['refreshed'] = _refresh_fingerprints(old_keywords, written)
+        set_meta('scored_keywords', json.dumps(new_keywords))
+    print(f"Keyword change {sorted(changed) or '(none)'}: {result['candidates']} candidate leads, "
+          f"{result['score_changed']} scores change, {len(result['gained'])} gain triage, "
+          f"{len(result['lost'])} lose triage ({time.perf_counter() - start:.2f}s)")
+    return result
+
+def portfolio_impact(old_portfolios: Dict[str, List[str]], new_portfolios: Dict[str, List[str]]) -> Dict[str, Dict[str, List[str]]]:
+    """sam_id -> {'added': [...], 'removed': [...]} portfolios, for leads whose matches change."""
+    changed = set()
+    for name in set(old_portfolios) | set(new_portfolios):
+        changed |= set(old_portfolios.get(name, [])) ^ set(new_portfolios.get(name, []))
+    conn = _connect()
+    ids = set()
+    for kw in changed:
+        for variant in expand_keyword(kw):
+            ids |= _phrase_candidates(conn, variant, plural=True)
+    conn.close()
+    old_matcher, new_matcher = compile_portfolios(old_portfolios), compile_portfolios(new_portfolios)
+    result = {}
+    for lead in query_leads_by_ids(sorted(ids)):
+        text = " ".join((lead.get('title') or "", lead.get('description') or "", lead.get('parsed_doc_text') or ""))
+        before, after = old_matcher.match(text)[0], new_matcher.match(text)[0]
+        if before != after:
+            result[lead['sam_id']] = {'added': sorted(after - before), 'removed': sorted(before - after)}
+    print(f"Portfolio change: {len(ids)} candidate leads, {len(result)} change portfolio matches")
+    return result
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Inverted term index over stored leads; impact of keyword changes")
+    ap.add_argument("--rebuild", action="store_true", help="Re-index every lead, not just new/changed ones")
+    ap.add_argument("--add", action="append", default=[], help="What-if: keyword to add (repeatable)")
+    ap.add_argument("--remove", action="append", default=[], help="What-if: keyword to remove (repeatable)")
+    ap.add_argument("--portfolio", help="Apply --add/--remove to this [portfolios] entry instead of [filters] keywords")
+    ap.add_argument("--apply", action="store_true", help="Write the new scores of affected leads")
+    args = ap.parse_args()
+
+    update_index(args.rebuild)
+    if args.portfolio:
+        old = {name: list(kws) for name, kws in config.get('portfolios', {}).items()}
+        new = {name: list(kws) for name, kws in old.items()}
+        kws = new.setdefault(args.portfolio, [])
+        new[args.portfolio] = [kw for kw in kws if kw not in args.remove] + [kw for kw in args.add if kw not in kws]
+        for sam_id, change in portfolio_impact(old, new).items():
+            print(f"  {sam_id}: +{change['added']} -{change['removed']}")
+    else:
+        current = list(config['filters']['keywords'])
+        if args.add or args.remove:  # what-if against the current config
+            old = current
+            new = [kw for kw in current if kw not in args.remove] + [kw for kw in args.add if kw not in current]
+        else:  # config edited since the stored scores: baseline -> current
+            old, new = baseline_keywords(), current
+        result = impact(old, new, apply=args.apply)
+        for sam_id in result['gained']:
+            print(f"  + {sam_id}")
+        for sam_id in result['lost']:
+            print(f"  - {sam_id}")
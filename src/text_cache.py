@@ -0,0 +1,63 @@
+import os
+import hashlib
+import inspect
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Optional
+import tomllib
+
+# Load config with robust path (works for direct run or import)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'configs', 'leadgen.toml')
+with open(config_path, "rb") as f:
+    config = tomllib.load(f)
+
+# Extracted-text cache: (content sha256, extractor name, extractor version) -> text.
+# The version is a hash of the extractor's source (plus any library versions passed in),
+# so editing the extraction code invalidates old entries without a manual flush.
+cache_path = config.get("attachments", {}).get("text_cache_path") or os.path.join(os.path.dirname(__file__), '..', 'data', 'text_cache.db')
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    conn = sqlite3.connect(cache_path, timeout=30)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS extracted_text (
+            sha256 TEXT,
+            extractor TEXT,
+            version TEXT,
+            text TEXT,
+            created_at TEXT,
+            PRIMARY KEY (sha256, extractor, version)
+        )
+    ''')
+    return conn
+
+@lru_cache(maxsize=None)
+def code_version(func: Callable, *extra: str) -> str:
+    """Short hash of func's source code plus extra version strings (e.g. library __version__)."""
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = func.__qualname__
+    return hashlib.sha256("\n".join((source,) + extra).encode()).hexdigest()[:16]
+
+def get_text(sha256: str, extractor: str, version: str) -> Optional[str]:
+    """Cached text ('' = extractor found no text), or None on a miss."""
+    conn = _connect()
+    row = conn.execute(
+        "SELECT text FROM extracted_text WHERE sha256 = ? AND extractor = ? AND version = ?",
+        (sha256, extractor, version)
+    ).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def put_text(sha256: str, extractor: str, version: str, text: Optional[str]) -> None:
+    conn = _connect()
+    conn.execute(
+        "INSERT OR REPLACE INTO extracted_text (sha256, extractor, version, text, created_at) VALUES (?, ?, ?, ?, ?)",
+        (sha256, extractor, version, text or "", datetime.now().isoformat())
+    )
+    # Entries from older extractor versions can never hit again
+    conn.execute("DELETE FROM extracted_text WHERE sha256 = ? AND extractor = ? AND version != ?", (sha256, extractor, version))
+    conn.commit()
+    conn.close()
@@ -21,7 +21,8 @@ for section in config:
     for key, value in config[section].items():
         config[section][key] = interpolate_env(value)
 
-from src.scorer import should_triage, fit_score, risk_score  # For triage logic
+from src.batch_scorer import score_batch  # For triage logic
+from src.detector import compute_score_fingerprints
 from src.storage import init_db, upsert_lead, query_leads  # Assuming DB integration
 
 def query_triagable(since_date: str = None) -> List[Dict]:
@@ -34,15 +35,23 @@ def query_triagable(since_date: str = None) -> List[Dict]:
     return triagable
 
 def triaged_leads(leads: List[Dict]) -> List[Dict]:
-    """Filter and score leads, return only those that should be triaged."""
+    """Score leads, return only those that should be triaged. Every lead gets its fit/risk
+    scores and score_fingerprint set in place, so callers can store the rest as well."""
+    if not leads:
+        return []
+    scores = score_batch(leads)  # Whole batch as arrays; same results as should_triage per lead
     triaged = []
-    for lead in leads:
-        if should_triage(lead):
-            lead['fit_score'] = fit_score(lead.get('description', '') + ' ' + lead.get('parsed_doc_text', ''), config['filters']['keywords'])
-            lead['risk_score'] = risk_score(lead)
-            lead['triaged'] = True
-            lead['triaged_at'] = datetime.now().isoformat()
-            triaged.append(lead)
+    now = datetime.now().isoformat()
+    # Only this batch is scored: the term_index keyword baseline moves on a full rescore
+    for lead, fit, risk, fp in zip(leads, scores['fit'], scores['risk'], compute_score_fingerprints(leads)):
+        lead['fit_score'] = float(fit)
+        lead['risk_score'] = float(risk)
+        lead['score_fingerprint'] = fp
+    for i in scores['triage'].nonzero()[0]:
+        lead = leads[i]
+        lead['triaged'] = True
+        lead['triaged_at'] = now
+        triaged.append(lead)
     return triaged
 
 def write_triage(triaged: List[Dict], output_file: str = None) -> str: